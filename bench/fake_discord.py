@@ -0,0 +1,175 @@
+"""A local stand-in for the Discord gateway and REST API, just complete enough to run the bot against.
+
+The gateway identifies a single shard into one guild, then streams synthetic MESSAGE_CREATE events
+as fast as the client reads them. REST calls are answered with minimal valid payloads and counted.
+"""
+import asyncio, json, random, time
+from collections import Counter
+from aiohttp import web
+
+_epoch = 1420070400000
+_words = ('the', 'a', 'bot', 'music', 'server', 'lol', 'anyone', 'here', 'play', 'game', 'tonight', 'what',
+          'is', 'this', 'nice', 'thanks', 'help', 'with', 'code', 'python', 'error', 'works', 'now', 'ok')
+
+def _json(data):
+    # discord.py only decodes bodies whose content type is exactly application/json, without a charset
+    return web.Response(body=json.dumps(data).encode('utf-8'), headers={'Content-Type': 'application/json'})
+
+class Config:
+    def __init__(self, *, messages=20000, warmup=1000, commands=0.05, names=('ping', 'uptime', 'snipe'),
+                 users=500, channels=10, rate=0.0, simulated_rate=5.0, seed=0):
+        self.messages, self.warmup = messages, warmup
+        self.commands, self.names = commands, names
+        self.users, self.channels = users, channels
+        self.rate, self.simulated_rate, self.seed = rate, simulated_rate, seed
+
+
+class FakeDiscord:
+    guild_id, bot_id, owner_id = 100000000000000000, 200000000000000000, 300000000000000000
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.requests = Counter()
+        self.port = None
+        self._ids = 0
+        self._clock = time.time() * 1000
+
+    def snowflake(self, advance=0.0):
+        self._clock += advance
+        self._ids += 1
+        return ((int(self._clock) - _epoch) << 22) | (self._ids & 0x3FFFFF)
+
+    def user(self, user_id, *, bot=False):
+        return {'id': str(user_id), 'username': f'user{user_id % 100000}', 'discriminator': '0001', 'avatar': None, 'bot': bot}
+
+    def member(self, user_id, *, bot=False):
+        return {'user': self.user(user_id, bot=bot), 'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00', 'deaf': False, 'mute': False}
+
+    def channel_ids(self):
+        return [self.guild_id + 1 + index for index in range(self.config.channels)]
+
+    def guild(self):
+        channels = [{'id': str(channel_id), 'type': 0, 'name': f'channel-{index}', 'position': index,
+                     'permission_overwrites': [], 'nsfw': False, 'parent_id': None}
+                    for index, channel_id in enumerate(self.channel_ids())]
+        everyone = {'id': str(self.guild_id), 'name': '@everyone', 'permissions': '104324673', 'position': 0,
+                    'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}
+        return {
+            'id': str(self.guild_id), 'name': 'Benchmark', 'icon': None, 'owner_id': str(self.owner_id),
+            'region': 'us-east', 'afk_channel_id': None, 'afk_timeout': 300, 'verification_level': 0,
+            'default_message_notifications': 0, 'explicit_content_filter': 0, 'mfa_level': 0,
+            'features': [], 'emojis': [], 'roles': [everyone], 'channels': channels, 'threads': [],
+            'members': [self.member(self.bot_id, bot=True), self.member(self.owner_id)], 'presences': [],
+            'voice_states': [], 'member_count': self.config.users + 2, 'large': False, 'unavailable': False,
+            'joined_at': '2021-01-01T00:00:00+00:00', 'system_channel_id': None, 'premium_tier': 0,
+        }
+
+    def message(self, *, advance):
+        author_id = self.owner_id + 1 + self.random.randrange(self.config.users)
+        if self.random.random() < self.config.commands:
+            content = '?' + self.random.choice(self.config.names)
+        else:
+            content = ' '.join(self.random.choice(_words) for _ in range(self.random.randint(3, 12)))
+        return {
+            'id': str(self.snowflake(advance)), 'channel_id': str(self.random.choice(self.channel_ids())),
+            'guild_id': str(self.guild_id), 'author': self.user(author_id), 'member': self.member(author_id),
+            'content': content, 'timestamp': '2021-01-01T00:00:00+00:00', 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': [], 'pinned': False, 'type': 0,
+        }
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        sequence = 0
+
+        async def dispatch(event, data):
+            nonlocal sequence
+            sequence += 1
+            await ws.send_str(json.dumps({'op': 0, 't': event, 's': sequence, 'd': data}))
+
+        async def stream():
+            total = self.config.warmup + self.config.messages
+            advance = 1000.0 / self.config.simulated_rate
+            for _ in range(total):
+                await dispatch('MESSAGE_CREATE', self.message(advance=advance))
+                if self.config.rate:
+                    await asyncio.sleep(1.0 / self.config.rate)
+
+        await ws.send_str(json.dumps({'op': 10, 'd': {'heartbeat_interval': 41250}}))
+        streaming = None
+        async for frame in ws:
+            if frame.type != web.WSMsgType.TEXT:
+                continue
+            payload = json.loads(frame.data)
+            if payload['op'] == 1:
+                await ws.send_str(json.dumps({'op': 11}))
+            elif payload['op'] == 2:
+                await dispatch('READY', {
+                    'v': 6, 'user': self.user(self.bot_id, bot=True), 'session_id': 'benchmark',
+                    'guilds': [{'id': str(self.guild_id), 'unavailable': True}], 'private_channels': [],
+                    'relationships': [], 'shard': payload['d'].get('shard', [0, 1]),
+                    'application': {'id': str(self.bot_id), 'flags': 0},
+                })
+                await dispatch('GUILD_CREATE', self.guild())
+                streaming = asyncio.ensure_future(stream())
+        if streaming is not None:
+            streaming.cancel()
+        return ws
+
+    async def rest(self, request):
+        path, method = request.match_info['path'], request.method
+        self.requests[f'{method} /{path.split("/")[0]}'] += 1
+
+        if path == 'users/@me' and method == 'GET':
+            return _json(self.user(self.bot_id, bot=True))
+        if path in ('gateway', 'gateway/bot'):
+            return _json({'url': f'ws://127.0.0.1:{self.port}/gateway', 'shards': 1,
+                                      'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}})
+        if path == 'users/@me/channels':
+            return _json({'id': str(self.snowflake()), 'type': 1, 'recipients': [self.user(self.owner_id + 1)]})
+
+        parts = path.split('/')
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'channels' and parts[2] == 'messages':
+            content = ''
+            if request.content_type == 'application/json':
+                content = (await request.json()).get('content') or ''
+            return _json({
+                'id': str(self.snowflake()), 'channel_id': parts[1], 'author': self.user(self.bot_id, bot=True),
+                'content': content, 'timestamp': '2021-01-01T00:00:00+00:00', 'edited_timestamp': None,
+                'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+                'embeds': [], 'pinned': False, 'type': 0,
+            })
+        if method in ('DELETE', 'PUT'):
+            return web.Response(status=204)
+        return _json({})
+
+    async def report(self, _):
+        return _json(dict(self.requests))
+
+    async def start(self, port=0):
+        app = web.Application()
+        app.router.add_get('/gateway', self.gateway)
+        app.router.add_get('/requests', self.report)
+        app.router.add_route('*', '/api/{version}/{path:.*}', self.rest)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return runner
+
+
+def serve(config, ports):
+    """Runs the fake server until the process is terminated, reporting its port through a queue.
+
+    The REST calls it answered are counted by route and served as JSON on /requests.
+    """
+    async def run():
+        fake = FakeDiscord(config)
+        await fake.start()
+        ports.put(fake.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
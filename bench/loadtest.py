@@ -0,0 +1,133 @@
+"""Drives the bot with synthetic messages from a local fake Discord and reports how fast it handles them.
+
+Run from the repository root, without network access:
+
+    python -m bench.loadtest --messages 20000 --commands 0.05 --command ping --command uptime
+
+The fake gateway and REST server run in a separate process, so that the CPU time and memory
+reported are those of the bot alone. The first --warmup messages are not measured.
+"""
+import argparse, asyncio, json, multiprocessing, os, resource, tempfile, time
+import aiohttp
+
+from .fake_discord import Config, FakeDiscord, serve
+
+def _rss():
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+class Probe:
+    """Counts the messages the bot has dispatched and snapshots resource usage around the measured ones."""
+    def __init__(self, warmup, total):
+        self.warmup, self.total = warmup, total
+        self.seen = 0
+        self.start = self.end = None
+        self.done = asyncio.Event()
+
+    @staticmethod
+    def snapshot():
+        return time.perf_counter(), time.process_time(), _rss()
+
+    async def on_message(self, _):
+        self.seen += 1
+        if self.seen == self.warmup:
+            self.start = self.snapshot()
+        if self.seen == self.total:
+            self.done.set()
+
+
+async def _settle(timeout=30.0):
+    """Waits for tasks started by the last messages, such as command replies, to finish."""
+    deadline, previous, stable = time.perf_counter() + timeout, None, 0
+    while stable < 5 and time.perf_counter() < deadline:
+        await asyncio.sleep(0.02)
+        count = len(asyncio.all_tasks())
+        stable = stable + 1 if count == previous else 0
+        previous = count
+
+async def run(config, port):
+    import discord.http
+    discord.http.Route.BASE = f'http://127.0.0.1:{port}/api/v7'
+
+    from main import NutsandBolts
+    bot = NutsandBolts()
+    probe = Probe(config.warmup, config.warmup + config.messages)
+    bot.add_listener(probe.on_message)
+
+    runner = asyncio.ensure_future(bot.start(os.environ['TOKEN']))
+    done = asyncio.ensure_future(probe.done.wait())
+    await asyncio.wait((runner, done), timeout=600.0, return_when=asyncio.FIRST_COMPLETED)
+    if not done.done():
+        done.cancel()
+        raise RuntimeError(f'Only {probe.seen} of {probe.total} messages arrived.') from (runner.exception() if runner.done() else None)
+    await _settle()
+    probe.end = Probe.snapshot()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'http://127.0.0.1:{port}/requests') as response:
+            requests = await response.json()
+
+    stats, timings = bot.get_cog('Stats'), bot.pipeline.timings
+    await bot.close()
+    await asyncio.gather(runner, return_exceptions=True)
+    return stats, timings, probe, requests
+
+
+def report(config, stats, timings, probe, requests):
+    (wall_start, cpu_start, rss_start), (wall_end, cpu_end, rss_end) = probe.start, probe.end
+    wall, cpu = wall_end - wall_start, cpu_end - cpu_start
+
+    print(f'Messages:     {config.messages} measured after {config.warmup} warmup, {100*config.commands:g}% commands ({", ".join(config.names)})')
+    print(f'Throughput:   {config.messages / wall:,.0f} messages/s over {wall:.2f} s')
+    print(f'CPU:          {1e6 * cpu / config.messages:,.1f} us/message ({100 * cpu / wall:.0f}% of one core)')
+    print(f'Memory:       {rss_start / 2**20:.1f} MiB -> {rss_end / 2**20:.1f} MiB '
+          f'({(rss_end - rss_start) / config.messages:+,.1f} bytes/message), peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB')
+    print(f'REST calls:   {json.dumps(requests, sort_keys=True)}')
+    print('Pipeline:     ' + ', '.join(f'{name} {1e6 * total / count:.2f} us x {count}' for name, count, total in timings if count))
+
+    if stats is not None and stats.metrics.commands:
+        for name, metrics in sorted(stats.metrics.commands.items()):
+            latency = f', p95 <= {metrics.latency.quantile(0.95):g} s' if metrics.latency.count else ''
+            print(f'  ?{name}: {metrics.count} runs, {sum(metrics.errors.values())} errors{latency}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline message throughput benchmark.')
+    parser.add_argument('--messages', type=int, default=20000, help='messages to measure')
+    parser.add_argument('--warmup', type=int, default=1000, help='messages sent before measuring')
+    parser.add_argument('--commands', type=float, default=0.05, help='share of messages that invoke a command')
+    parser.add_argument('--command', action='append', dest='names', help='command to invoke, may be repeated')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=0.0, help='messages per second to send, or 0 for as fast as possible')
+    parser.add_argument('--simulated-rate', type=float, default=5.0, help='messages per second implied by message timestamps')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = Config(messages=args.messages, warmup=max(args.warmup, 1), commands=args.commands,
+                    names=tuple(args.names or ('ping', 'uptime', 'snipe')), users=args.users, channels=args.channels,
+                    rate=args.rate, simulated_rate=args.simulated_rate, seed=args.seed)
+
+    directory = tempfile.mkdtemp(prefix='bench-')
+    os.environ.update({
+        'TOKEN': 'benchmark', 'OWNER_ID': str(FakeDiscord.owner_id), 'CHUNK_GUILDS': '0',
+        'BLOCKLIST_PATH': os.path.join(directory, 'blocklist.json'), 'MODLOG_PATH': os.path.join(directory, 'modlog.jsonl'),
+        'RAID_PATH': os.path.join(directory, 'raid.json'),
+    })
+    for name in ('METRICS_PORT', 'IPC_PORT', 'SHARD_IDS', 'SHARD_COUNT'):
+        os.environ.pop(name, None)
+
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    server = context.Process(target=serve, args=(config, ports), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=30.0)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        report(config, *loop.run_until_complete(run(config, port)))
+    finally:
+        server.terminate()
+
+if __name__ == '__main__':
+    main()
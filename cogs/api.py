@@ -1,16 +1,21 @@
-import urllib.parse, urllib.request
+import os, hashlib, urllib.parse, aiohttp
 from typing import Optional
+from functools import partial
 from io import BytesIO
-from PIL import Image
-import googletrans
-from youtubesearchpython import VideosSearch, ResultMode
-from pytio import Tio, TioRequest
 
+from .utils import imaging, langdetect
+from .utils.cache import ExpiringCache
+from .utils.executors import LocalBackend, TioBackend
+from .utils.lazy import LazyModule
+from .utils.scheduler import Scheduler
 from .utils.paginator import Embed, Pages
 
 from discord.ext import commands, menus
 import discord
 
+googletrans = LazyModule('googletrans')
+youtubesearchpython = LazyModule('youtubesearchpython')
+
 class YouTubePageSource(menus.ListPageSource):
     def __init__(self, data, context):
         super().__init__(entries=data, per_page=6)
@@ -33,12 +38,29 @@ class API(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.loop = self.bot.loop
-        self.trans = googletrans.Translator()
+        self._trans = None
+        self.scheduler = Scheduler(self.loop, workers=4, per_user=1, per_guild=2)
+
+        self.backends = [TioBackend()]
+        if os.environ.get('RUN_BACKEND') == 'local':
+            self.backends.insert(0, LocalBackend(user=os.environ.get('RUN_USER')))
+        self._results = ExpiringCache(3600.0, max_size=256)
+
+    def cog_unload(self):
+        self.scheduler.close()
+
+    @property
+    def trans(self):
+        if self._trans is None:
+            self._trans = googletrans.Translator()
+        return self._trans
 
     @commands.command()
     async def translate(self, ctx, *, message: Optional[commands.clean_content]):
         """Translates a message to English with Google Translate.
         
+        Messages that are already in English are returned without a remote lookup.
+
         Replying with this command will translate the referred message content.
         """
         if message is None:
@@ -48,21 +70,29 @@ class API(commands.Cog):
             else:
                 return await ctx.reply('Please provide a message to translate.')
         
-        result = await self.loop.run_in_executor(None, self.trans.translate, message)
+        if langdetect.is_english(message):
+            # named locally, since looking it up would import googletrans just to say English
+            src = dest = 'English'
+            origin = text = message
+        else:
+            # profile guesses are only good enough to skip English, but scripts are reliable hints
+            hint = langdetect.script(message) or 'auto'
+            translate = partial(self.trans.translate, message, dest='en', src=hint)
+            result = await self.loop.run_in_executor(None, translate)
+            origin, text = result.origin, result.text
+            src = googletrans.LANGUAGES.get(result.src, 'Auto Detection').title()
+            dest = googletrans.LANGUAGES.get(result.dest, 'Unknown').title()
 
         embed = Embed(title='Translator', ctx=ctx)
         embed.set_thumbnail(url='https://i.postimg.cc/mDqNXRkM/translate.png')
-
-        src = googletrans.LANGUAGES.get(result.src, 'Auto Detection').title()
-        dest = googletrans.LANGUAGES.get(result.dest, 'Unknown').title()
-        embed.add_field(name=f'From {src}', value=result.origin, inline=False)
-        embed.add_field(name=f'To {dest}', value=result.text, inline=False)
+        embed.add_field(name=f'From {src}', value=origin, inline=False)
+        embed.add_field(name=f'To {dest}', value=text, inline=False)
 
         await ctx.send(embed=embed)
     
     async def retrieve_videos(self, query: Optional[str], *, amount: Optional[int] = 12):
-        videos = await self.loop.run_in_executor(None, VideosSearch, query, amount)
-        return videos.result(mode=ResultMode.dict)['result']
+        videos = await self.loop.run_in_executor(None, youtubesearchpython.VideosSearch, query, amount)
+        return videos.result(mode=youtubesearchpython.ResultMode.dict)['result']
     
     def format_videos(self, videos: Optional[dict]):
         formatted = []
@@ -90,25 +120,19 @@ class API(commands.Cog):
         menu = Pages(YouTubePageSource(self.format_videos(result), ctx), ctx)
         await menu.start(ctx)
 
-    def generate_file(self, tex):
-        margin, overlay = 20, '\hspace*{-0.5cm}'
+    async def generate_file(self, tex):
+        overlay = '\hspace*{-0.5cm}'
         url = 'https://latex.codecogs.com/gif.latex?{0}'
         template = '\\dpi{{{}}} \\bg_white {}'
 
         query = template.format(200, overlay+tex)
         read = url.format(urllib.parse.quote(query))
-        raw = urllib.request.urlopen(read).read()
-        old = Image.open(BytesIO(raw))
-
-        size = (old.size[0] + margin, old.size[1] + margin)
-        new = Image.new("RGB", size, (255, 255, 255))
-        new.paste(old, (int(margin / 2), int(margin / 2)))
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10.0)) as session:
+            async with session.get(read, raise_for_status=True) as response:
+                raw = await response.read()
 
-        data = BytesIO()
-        new.save(data, 'PNG')
-
-        data.seek(0)
-        return data
+        data = await self.bot.images.submit(imaging.pad, raw, margin=20)
+        return BytesIO(data)
 
     @commands.command(aliases=['tex'])
     async def latex(self, ctx, *, code: Optional[str]):
@@ -123,7 +147,7 @@ class API(commands.Cog):
             else:
                 return await ctx.reply('Please provide code to parse.')
         
-        generated = await self.loop.run_in_executor(None, self.generate_file, code)
+        generated = await self.generate_file(code)
         await ctx.reply(file=discord.File(generated, filename='latex.png'))
 
     @commands.command()
@@ -131,17 +155,27 @@ class API(commands.Cog):
         """Runs code with the Try It Online interpreter.
         
         Languages currently supported: Python 3, C, C++, C#, Java, Javascript, Rust, and PHP.
+        Python 3, C and C++ may instead run in a local sandbox if the bot is configured to do so.
+
+        Each member can run one program at a time, and each server two.
+        Additional submissions wait in a queue and are told their position.
+
+        Results of identical submissions that ran without errors are reused for an hour.
+        Start the code with `--fresh` to run it again regardless, e.g. for random output.
 
         Replying with this command will parse the referred message content.
         """
+        parts = code.split(maxsplit=1) if code else []
+        fresh = parts[:1] == ['--fresh']
+        if fresh:
+            code = parts[1] if len(parts) > 1 else None
+
         if code is None:
             ref = ctx.message.reference
             if ref and ref.resolved.content and isinstance(ref.resolved, discord.Message):
                 code = ref.resolved.content
             else:
                 return await ctx.reply('Please provide code to parse.')
-        
-        instance = Tio()
 
         attrs = {
             'python3' : (('py3', 'py', 'python3', 'python'), 'https://i.postimg.cc/s21LPtxY/python.png'),
@@ -164,33 +198,37 @@ class API(commands.Cog):
         if idx == len(attrs):
             return await ctx.reply('This language is not currently supported.')
         
-        request = TioRequest(lang=access, code=code)
-        result = await self.loop.run_in_executor(None, instance.send, request)
+        async def on_queue(position):
+            await ctx.reply(f'Your code is queued at position {position}.')
+
+        key = (access, hashlib.sha256(code.encode('utf-8')).hexdigest())
+        result = None if fresh else self._results.get(key)
+        cached = result is not None
+        if not cached:
+            guild = ctx.guild.id if ctx.guild else ctx.channel.id
+            backend = next(backend for backend in self.backends if backend.supports(access))
+            result = await self.scheduler.submit(ctx.author.id, guild, backend.execute, access, code, on_queue=on_queue)
+            # failures such as timeouts or killed runs may be transient, so only clean runs are reused
+            if not result.error and result.exit.strip() == '0':
+                self._results[key] = result
 
         embed = Embed(title=attrs[access][0][-1].capitalize(), ctx=ctx)
         embed.set_thumbnail(url=attrs[access][1])
+        if cached:
+            embed.set_footer(text='Cached result. Start the code with --fresh to run it again.')
 
         names = ['Real Time', 'User Time', 'Sys. Time', 'CPU Share', 'Exit Code']
-        read = str(result.debug.decode('utf-8'))
-        cut = read.index(names[0].capitalize())
-        data = read[cut-1:].split('\n')
-        times = []
-        for idx in range(1, 5):
-            times.append(''.join(data[idx][11:].split(' ')))
-        
-        times.append(data[5][11:])
-
-        for idx in range(len(names)):
-            embed.add_field(name=names[idx], value=times[idx])
+        for name, value in zip(names, result.timings):
+            embed.add_field(name=name, value=value)
 
         if result.error:
             if len(result.error) > 1024:
                 return await ctx.reply('Error message is too long to be displayed.')
-            embed.add_field(name='Error', value='```\n'+result.error[:cut-2]+'```')
+            embed.add_field(name='Error', value='```\n'+result.error+'```')
         else:
-            if len(result.result) > 1024:
+            if len(result.output) > 1024:
                 return await ctx.reply('Standard output is too long to be displayed.')
-            embed.add_field(name='Standard Output', value='```\n'+result.result+'```')
+            embed.add_field(name='Standard Output', value='```\n'+result.output+'```')
         
         await ctx.send(embed=embed)
 
@@ -1,35 +1,21 @@
 import time
 
+from .utils import lazy
 from .utils.paginator import Embed, Pages
 
 from discord.ext import commands, menus
 
 class HelpPageSource(menus.ListPageSource):
-    def __init__(self, help_command, commands, context):
-        super().__init__(entries=sorted(commands.keys(), key=lambda c: c.qualified_name), per_page=6)
-        self.help_command = help_command
-        self.commands = commands
+    def __init__(self, fields, context):
+        super().__init__(entries=fields, per_page=6)
         self.context = context
     
-    async def format_page(self, menu, cogs):
+    async def format_page(self, menu, fields):
         description = f'Use `?help [command]` for more information on a command group.'
         embed = Embed(title='Categories', description=description, ctx=self.context)
         
-        for cog in cogs:
-            commands = self.commands.get(cog)
-            if commands:
-                short_doc = cog.description.split('\n', 1)[0]+'\n'
-                current_count = len(short_doc)
-
-                page = []
-                for command in commands:
-                    form = f'`{command.name}`'
-                    count = len(form)+2
-                    if count + current_count < 900:
-                        current_count += count
-                        page.append(form)
-                
-                embed.add_field(name=cog.qualified_name, value=short_doc + ' '.join(page), inline=True)
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=True)
         
         max_pages = self.get_max_pages()
         if max_pages > 1:
@@ -38,19 +24,18 @@ class HelpPageSource(menus.ListPageSource):
 
 
 class GroupPageSource(menus.ListPageSource):
-    def __init__(self, group, commands, context):
-        super().__init__(entries=commands, per_page=6)
+    def __init__(self, group, fields, context):
+        super().__init__(entries=fields, per_page=6)
         self.group = group
         self.title = f'{self.group.qualified_name} Commands'
         self.description = self.group.description
         self.context = context
     
-    async def format_page(self, menu, commands):
+    async def format_page(self, menu, fields):
         embed = Embed(title=self.title, description=self.description, ctx=self.context)
         
-        for command in commands:
-            signature = f'{command.qualified_name} {command.signature}'
-            embed.add_field(name=signature, value=command.short_doc, inline=False)
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=False)
         
         embed.set_footer(text=f'Use ?help [command] for more info on a command')
         return embed
@@ -74,9 +59,28 @@ class Help(commands.HelpCommand):
             aliases = command.name if not parent else f'{parent} {command.name}'
         return f'{aliases} {command.signature}'
     
-    async def send_bot_help(self, _):
-        bot = self.context.bot
-        entries = await self.filter_commands(bot.commands, sort=True)
+    async def _cached(self, key, build):
+        """Returns the fields of a help page as seen by the caller.
+
+        Which commands a caller may see only depends on whether they are in a guild, their permissions
+        in the channel and whether they own the bot, so fields are built once for each combination and
+        kept until the bot adds or removes a command, such as when an extension is reloaded.
+        """
+        ctx, cache = self.context, self.context.bot.help_cache
+        permissions = ctx.channel.permissions_for(ctx.author)
+        key = (key, ctx.guild is None, permissions.value, await ctx.bot.is_owner(ctx.author))
+        try:
+            return cache[key]
+        except KeyError:
+            fields = cache[key] = await build()
+            return fields
+
+    async def _command_fields(self, commands):
+        entries = await self.filter_commands(commands, sort=True)
+        return [(f'{command.qualified_name} {command.signature}', command.short_doc) for command in entries]
+
+    async def _cog_fields(self):
+        entries = await self.filter_commands(self.context.bot.commands, sort=True)
 
         all_commands = {}
         for command in entries:
@@ -87,13 +91,30 @@ class Help(commands.HelpCommand):
             except KeyError:
                 all_commands[command.cog] = [command]
 
-        menu = Pages(HelpPageSource(self, all_commands, self.context), self.context)
+        fields = []
+        for cog in sorted(all_commands, key=lambda c: c.qualified_name):
+            short_doc = cog.description.split('\n', 1)[0]+'\n'
+            current_count = len(short_doc)
+
+            page = []
+            for command in all_commands[cog]:
+                form = f'`{command.name}`'
+                count = len(form)+2
+                if count + current_count < 900:
+                    current_count += count
+                    page.append(form)
+            fields.append((cog.qualified_name, short_doc + ' '.join(page)))
+        return fields
+
+    async def send_bot_help(self, _):
+        fields = await self._cached(None, self._cog_fields)
+        menu = Pages(HelpPageSource(fields, self.context), self.context)
         await menu.start(self.context)
     
     async def send_cog_help(self, cog):
-        entries = await self.filter_commands(cog.get_commands(), sort=True)
+        fields = await self._cached(('cog', cog.qualified_name), lambda: self._command_fields(cog.get_commands()))
         
-        menu = Pages(GroupPageSource(cog, entries, self.context), self.context)
+        menu = Pages(GroupPageSource(cog, fields, self.context), self.context)
         await menu.start(self.context)
     
     async def send_group_help(self, group):
@@ -101,11 +122,11 @@ class Help(commands.HelpCommand):
         if len(sub) == 0:
             return await self.send_command_help(group)
 
-        entries = await self.filter_commands(sub, sort=True)
-        if len(entries) == 0:
+        fields = await self._cached(('group', group.qualified_name), lambda: self._command_fields(sub))
+        if len(fields) == 0:
             return await self.send_command_help(group)
 
-        source = GroupPageSource(group, entries, self.context)
+        source = GroupPageSource(group, fields, self.context)
         source.title = self.get_command_signature(group)
         source.description = group.help
 
@@ -139,6 +160,11 @@ class Meta(commands.Cog):
     @commands.Cog.listener()
     async def on_connect(self):
         self.bot.then = round(time.time())
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.bot.ready_after is None:
+            self.bot.ready_after = time.perf_counter() - self.bot.started
     
     @commands.command(aliases=['up'])
     async def uptime(self, ctx):
@@ -155,6 +181,23 @@ class Meta(commands.Cog):
         uptime = f"{attrs['h'][(hrs, 2)[hrs > 1]]}{attrs['m'][(mins, 2)[mins > 1]]}{attrs['s'][(secs, 2)[secs > 1]]}"[:-2]
         await ctx.reply(f"{uptime}.")
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def startup(self, ctx):
+        """Shows how long each extension took to load and how long the bot took to be ready.
+
+        Third party modules that are only imported on first use are listed once they have been.
+        """
+        embed = Embed(title='Startup', ctx=ctx)
+        loads = sorted(self.bot.load_times.items(), key=lambda item: item[1][0], reverse=True)
+        embed.add_field(name='Extensions', value='\n'.join(f'`{name}`: {1000*spent:.0f} ms ({modules} modules)' for name, (spent, modules) in loads), inline=False)
+        if lazy.imports:
+            imports = sorted(lazy.imports.items(), key=lambda item: item[1], reverse=True)
+            embed.add_field(name='Deferred Imports', value='\n'.join(f'`{name}`: {1000*spent:.0f} ms' for name, spent in imports), inline=False)
+        if self.bot.ready_after is not None:
+            embed.add_field(name='Ready', value=f'{self.bot.ready_after:.2f} s after startup', inline=False)
+        await ctx.reply(embed=embed)
+
 
 def setup(bot):
     bot.add_cog(Meta(bot))
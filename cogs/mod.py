@@ -1,36 +1,21 @@
-import datetime, aiohttp
+import asyncio, datetime, logging, os, time, aiohttp
 from typing import Optional, Union
 from io import BytesIO
-from PIL import Image, ImageDraw
-from collections import Counter, defaultdict, OrderedDict
+from collections import Counter, OrderedDict
 from operator import attrgetter
 
-from .utils import checks
-from .utils.paginator import Embed
+from .utils import bulk, checks, imaging
+from .utils.cache import ExpiringCache
+from .utils.history import MessageIndex
+from .utils.paginator import Embed, Pages
+from .utils.raid import RaidDetector
+from .utils.snipe import SnipeStore
+from .utils.spam import SpamDetector
 
-from discord.ext import commands
+from discord.ext import commands, menus, tasks
 import discord
 
-class ContentCooldown(commands.CooldownMapping):
-    def _bucket_key(self, message):
-        return (message.channel.id, message.content)
-
-
-class SpamCheck:
-    def __init__(self):
-        self.short_check = ContentCooldown.from_cooldown(15, 15.0, commands.BucketType.member)
-        self.long_check = commands.CooldownMapping.from_cooldown(30, 32.0, commands.BucketType.channel)
-    
-    def is_spamming(self, message):
-        if message.guild is None:
-            return
-        
-        current = message.created_at.replace(tzinfo=datetime.timezone.utc).timestamp()
-        short_bucket = self.short_check.get_bucket(message)
-        long_bucket = self.long_check.get_bucket(message)
-        
-        return (short_bucket.update_rate_limit(current) or long_bucket.update_rate_limit(current))
-
+log = logging.getLogger(__name__)
 
 class Reason(commands.Converter):
     async def convert(self, ctx, argument: commands.clean_content):
@@ -41,22 +26,150 @@ class Reason(commands.Converter):
         return info
 
 
+class TargetID(commands.Converter):
+    async def convert(self, ctx, argument):
+        ids = bulk.parse_ids(argument)
+        if len(ids) != 1:
+            raise commands.BadArgument(f'"{argument}" is not a member mention or ID.')
+        return ids[0]
+
+
+class ModLogPageSource(menus.ListPageSource):
+    def __init__(self, entries, context):
+        super().__init__(entries=entries, per_page=6)
+        self.context = context
+    
+    async def format_page(self, menu, entries):
+        embed = Embed(title='Moderation Log', ctx=self.context)
+        for entry in entries:
+            when = datetime.datetime.utcfromtimestamp(entry.timestamp).strftime('%b %d, %Y %H:%M')
+            value = f'Moderator: <@{entry.moderator_id}>'
+            if entry.target_id:
+                value = f'Target: <@{entry.target_id}>\n' + value
+            if entry.detail:
+                value += f'\n{entry.detail}'
+            if entry.reason:
+                value += f'\nReason: {entry.reason}'
+            embed.add_field(name=f'{entry.action.capitalize()} ({when} UTC)', value=value, inline=False)
+        
+        max_pages = self.get_max_pages()
+        if max_pages > 1:
+            embed.set_footer(text=f'Page {menu.current_page + 1}/{max_pages}')
+        return embed
+
+
 class Mod(commands.Cog):
     """Moderation related commands."""
     def __init__(self, bot):
         self.bot = bot
-        self._deleted_messages = {}
-        self._spam_check = defaultdict(SpamCheck)
+        self._deleted_messages = SnipeStore()
+        self._recent_messages = MessageIndex()
+        self._badges, self._badges_retry = {}, 0.0
+        self._profiles = ExpiringCache(86400.0, max_size=512)
+        self.bot.loop.create_task(self._load_badges())
+        self._spam_check = SpamDetector()
+        self._spam_bans = ExpiringCache(86400.0, max_size=4096)
+        self._raids = RaidDetector(os.environ.get('RAID_PATH', 'raid.json'))
+        self._raid_queue = {}
+        self._raid_workers = {}
+        self._sweep.start()
+        self.bot.pipeline.add('index', self._index_message, order=0)
+        # spam runs before the bot and blocklist filters, so that blocked users and bots are still banned
+        self.bot.pipeline.add('spam', self._check_spam, order=5)
+
+    def cog_unload(self):
+        self.bot.pipeline.remove('index')
+        self.bot.pipeline.remove('spam')
+        self._sweep.cancel()
+        for worker in self._raid_workers.values():
+            worker.cancel()
+
+    @tasks.loop(minutes=5.0)
+    async def _sweep(self):
+        self._spam_check.sweep()
+        self._raids.sweep(time.time())
+        self._deleted_messages.sweep()
+    
+    def _index_message(self, message):
+        if message.guild:
+            self._recent_messages.add(message)
+        return True
+
+    def _check_spam(self, message):
+        if message.author == self.bot.user or not self._spam_check.is_spamming(message):
+            return True
+        notify = not self.bot.blocked.is_blocked(message.author.id)
+        if notify:
+            self.bot.blocked.add('global', message.author.id, duration=86400.0)
+
+        # a blocked spammer is still banned once in every other guild they spam, but only once
+        key = (message.guild.id if message.guild else None, message.author.id)
+        if notify or key not in self._spam_bans:
+            self._spam_bans[key] = None
+            self.bot.loop.create_task(self._punish_spammer(message, notify=notify))
+        return False
+
+    async def _punish_spammer(self, message, *, notify):
+        author, guild = message.author, message.guild
+        if notify:
+            try:
+                await author.send('You have been globally blocked from using this bot for one day due to spamming.')
+            except discord.HTTPException:
+                pass
+        if guild is None:
+            return
+
+        try:
+            await guild.ban(author, reason='Spam autoban.')
+        except discord.HTTPException as e:
+            return log.warning('Spam autoban of %s in guild %s failed: %s', author.id, guild.id, e)
+        self.bot.modlog.record(guild.id, 'ban', moderator_id=self.bot.user.id, target_id=author.id, reason='Spam autoban.')
     
     @commands.Cog.listener()
-    async def on_message(self, message):
-        checker = self._spam_check[message.guild.id] if message.guild else self._spam_check[message.channel.id]
-        if checker.is_spamming(message):
-            if message.author not in self.bot.blocked['global']:
-                await message.author.send('You have been globally blocked from using this bot for one day due to spamming.')
-            self.bot.blocked['global'].add(message.author)
-            if message.guild:
-                await message.guild.ban(message.author, reason='Spam autoban.')
+    async def on_member_join(self, member):
+        if self._raids.action(member.guild.id) is None:
+            return
+        
+        now = time.time()
+        raiding = self._raids.is_raiding(member.guild.id, now)
+        suspicious = self._raids.record(member, now)
+        if not raiding and self._raids.is_raiding(member.guild.id, now):
+            self._announce_raid(member.guild, len(suspicious))
+        if suspicious:
+            self._raid_queue.setdefault(member.guild.id, []).extend(suspicious)
+            if member.guild.id not in self._raid_workers:
+                self._raid_workers[member.guild.id] = self.bot.loop.create_task(self._raid_worker(member.guild))
+
+    def _announce_raid(self, guild, count):
+        action = {'ban': 'banned', 'kick': 'kicked'}[self._raids.action(guild.id)]
+        minutes = round(self._raids.duration / 60)
+        detail = f'{count} new accounts joined in a burst. New accounts are {action} for {minutes} minutes.'
+        self.bot.modlog.record(guild.id, 'raid mode', moderator_id=self.bot.user.id, detail=detail)
+
+        channel = guild.system_channel
+        if channel is not None and channel.permissions_for(guild.me).send_messages:
+            async def send():
+                try:
+                    await channel.send(f'\N{WARNING SIGN} Raid mode started. {detail} Use `?raid end` to stop early.')
+                except discord.HTTPException as e:
+                    log.warning('Could not announce raid mode in guild %s: %s', guild.id, e)
+            self.bot.loop.create_task(send())
+
+    async def _raid_worker(self, guild):
+        try:
+            while True:
+                await asyncio.sleep(1.0)
+                targets = list(OrderedDict.fromkeys(self._raid_queue.pop(guild.id, [])))
+                action = self._raids.action(guild.id)
+                if not (targets and action):
+                    break
+
+                async def apply(user_id):
+                    await getattr(guild, action)(discord.Object(id=user_id), reason=f'Raid auto{action}.')
+                    self.bot.modlog.record(guild.id, action, moderator_id=self.bot.user.id, target_id=user_id, reason=f'Raid auto{action}.')
+                await bulk.BulkAction(targets, apply, concurrency=5).run()
+        finally:
+            self._raid_workers.pop(guild.id, None)
     
     async def _modify_list(self, ctx, data, bucket: Optional[str] = 'members', max_length: Optional[int] = 5):
         data = list(OrderedDict.fromkeys(data))
@@ -86,18 +199,17 @@ class Mod(commands.Cog):
                     used = entity
                     if is_int:
                         entity = (await ctx.guild.fetch_ban(discord.Object(id=entity))).user
-                    try:
-                        getattr(self.bot.blocked[ctx.guild.id], attrs.get(action, str()))(entity)
-                    except AttributeError:
-                        try:
-                            await getattr(ctx.guild, action)(entity, reason=reason)
-                        except (AttributeError, KeyError):
-                            try:
-                                funcs = attrgetter(*attrs[action])(ctx.guild)
-                                [func(entity, reason=reason) for func in funcs]
-                            except (AttributeError, KeyError):
-                                await getattr(entity, action)(reason=reason)
+                    if action in ('block', 'unblock'):
+                        getattr(self.bot.blocked, attrs[action])(ctx.guild.id, entity.id)
+                    elif action == 'softban':
+                        for func in attrgetter(*attrs[action])(ctx.guild):
+                            await func(entity, reason=reason)
+                    elif hasattr(ctx.guild, action):
+                        await getattr(ctx.guild, action)(entity, reason=reason)
+                    else:
+                        await getattr(entity, action)(reason=reason)
                     successes.append(used)
+                    self.bot.modlog.record(ctx.guild.id, action, moderator_id=ctx.author.id, target_id=used if is_int else used.id, reason=reason)
             except errors as e:
                 dump[errors.index(type(e))].append(entity)
             else:
@@ -189,45 +301,195 @@ class Mod(commands.Cog):
         """
         await self._modify_access(ctx, 'unban', entities=ids, reason=reason)
     
+    def _truncate(self, items, limit: Optional[int] = 1024):
+        shown, total = [], 0
+        for idx, item in enumerate(items):
+            total += len(item)+1
+            if total > limit-20:
+                shown.append(f'and {len(items)-idx} more')
+                break
+            shown.append(item)
+        return ' '.join(shown)
+
+    async def _collect_targets(self, ctx, ids, max_length: Optional[int] = 1000):
+        for attachment in ctx.message.attachments[:1]:
+            if attachment.size <= 1 << 20:
+                ids = list(ids) + bulk.parse_ids((await attachment.read()).decode('utf-8', 'ignore'))
+        
+        ids = list(OrderedDict.fromkeys(ids))
+        if len(ids) > max_length:
+            await ctx.reply(f'You can only execute this action on {max_length} members at a time.')
+        return ids[:max_length]
+
+    async def _resolve_members(self, guild, ids):
+        members, missing = {}, []
+        for user_id in ids:
+            member = guild.get_member(user_id)
+            if member is None:
+                missing.append(user_id)
+            else:
+                members[user_id] = member
+        
+        if missing and not guild.chunked:
+            for idx in range(0, len(missing), 100):
+                for member in await guild.query_members(user_ids=missing[idx:idx+100], limit=100):
+                    members[member.id] = member
+        return members
+
+    async def _mass_modify(self, ctx, action, *, ids, reason: Optional[Reason]):
+        targets = await self._collect_targets(ctx, ids)
+        if not targets:
+            return await ctx.reply('Please provide at least one member or ID to perform this action on.')
+        
+        if reason is None:
+            reason = f'{ctx.author} (ID: {ctx.author.id}): No reason provided.'
+        
+        members = await self._resolve_members(ctx.guild, targets) if action != 'unban' else {}
+
+        async def apply(user_id):
+            member = members.get(user_id)
+            if member is not None and not checks.can_use(ctx, ctx.author, member):
+                raise commands.CheckFailure()
+            
+            entity = discord.Object(id=user_id)
+            if action == 'softban':
+                await ctx.guild.ban(entity, reason=reason)
+                await ctx.guild.unban(entity, reason=reason)
+            else:
+                await getattr(ctx.guild, action)(entity, reason=reason)
+            self.bot.modlog.record(ctx.guild.id, action, moderator_id=ctx.author.id, target_id=user_id, reason=reason)
+        
+        def cause(error):
+            if isinstance(error, commands.CheckFailure):
+                return 'You cannot edit these entities.'
+            if isinstance(error, discord.Forbidden):
+                return 'I cannot access these entities.'
+            if isinstance(error, discord.NotFound):
+                return 'These entities have not been banned.' if action == 'unban' else 'These entities do not exist.'
+            return 'Unexpected error.'
+
+        embed = Embed(title=f'Mass {action.capitalize()}', description=f'Processing {len(targets)} members...', ctx=ctx)
+        message = await ctx.send(embed=embed)
+
+        async def on_progress(job):
+            embed.description = f'Processed {job.done}/{len(targets)} members.'
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException:
+                pass
+        
+        job = await bulk.BulkAction(targets, apply, concurrency=5).run(on_progress=on_progress)
+
+        attrs = ('\N{CROSS MARK}', '\N{WHITE HEAVY CHECK MARK}')
+        embed.description = f'{len(job.successes)} succeeded, {len(job.failures)} failed.'
+        if job.successes:
+            embed.add_field(name=f'{attrs[-1]} Success', value=self._truncate([f'<@{user_id}>' for user_id in job.successes]), inline=False)
+        
+        grouped = {}
+        for user_id, error in job.failures.items():
+            grouped.setdefault(cause(error), []).append(f'<@{user_id}>')
+        for problem, failed in grouped.items():
+            embed.add_field(name=f'{attrs[0]} {problem}', value=self._truncate(failed), inline=False)
+        await message.edit(embed=embed)
+
+    @commands.group(invoke_without_command=True)
+    @commands.guild_only()
+    async def mass(self, ctx):
+        """Moderates many members at once, such as during a raid.
+        
+        Members can be given as mentions or IDs, or as a text file of IDs attached to the command.
+        Up to 1000 members can be handled per command.
+        """
+        await ctx.send_help(ctx.command)
+
+    @mass.command(name='ban')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def mass_ban(self, ctx, ids: commands.Greedy[TargetID], *, reason: Optional[Reason]):
+        """Bans many members or IDs from the server at once.
+        
+        To use this command, you must have the Ban Members permission.
+        The bot must have the Ban Members permission for this command to run.
+        """
+        await self._mass_modify(ctx, 'ban', ids=ids, reason=reason)
+
+    @mass.command(name='softban')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def mass_softban(self, ctx, ids: commands.Greedy[TargetID], *, reason: Optional[Reason]):
+        """Softbans many members of the server at once.
+        
+        To use this command, you must have the Ban Members permission.
+        The bot must have the Ban Members permission for this command to run.
+        """
+        await self._mass_modify(ctx, 'softban', ids=ids, reason=reason)
+
+    @mass.command(name='kick')
+    @commands.guild_only()
+    @checks.can_kick()
+    async def mass_kick(self, ctx, ids: commands.Greedy[TargetID], *, reason: Optional[Reason]):
+        """Kicks many members from the server at once.
+        
+        To use this command, you must have the Kick Members permission.
+        The bot must have the Kick Members permission for this command to run.
+        """
+        await self._mass_modify(ctx, 'kick', ids=ids, reason=reason)
+
+    @mass.command(name='unban')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def mass_unban(self, ctx, ids: commands.Greedy[TargetID], *, reason: Optional[Reason]):
+        """Revokes the ban from many IDs at once.
+        
+        To use this command, you must have the Ban Members permission.
+        The bot must have the Ban Members permission for this command to run.
+        """
+        await self._mass_modify(ctx, 'unban', ids=ids, reason=reason)
+    
     async def _modify_roles(self, ctx, action, *, entities, affixes, max_length: Optional[int] = 5, reason: Optional[Reason]):
-        entities = await self._modify_list(ctx, entities, max_length)
-        affixes = await self._modify_list(ctx, affixes, 'roles', max_length)
+        entities = await self._modify_list(ctx, entities, max_length=max_length)
+        affixes = await self._modify_list(ctx, affixes, 'roles')
         
         if reason is None:
             reason = f'{ctx.author} (ID: {ctx.author.id}): No reason provided.'
         
-        errors = (discord.Forbidden, discord.HTTPException, commands.BadArgument)
-        working = {}
-        dump = [[] for _ in range(4)]
-        for entity in entities:
-            for affix in affixes:
-                try:
-                    if checks.can_set(ctx, ctx.author, affix):
-                        await getattr(entity, action)(affix, reason=reason)
-                        try:
-                            working[affix].append(entity)
-                        except:
-                            working[affix] = [entity]
-                    else:
-                        dump[3].append(affix)
-                except errors as e:
-                    dump[errors.index(type(e))].append(affix)
+        allowed = [affix for affix in affixes if checks.can_set(ctx, ctx.author, affix)]
+
+        async def apply(entity):
+            current = [role for role in entity.roles if not role.is_default()]
+            if action == 'add_roles':
+                roles = current + [affix for affix in allowed if affix not in current]
+            else:
+                roles = [role for role in current if role not in allowed]
+            if roles != current:
+                await entity.edit(roles=roles, reason=reason)
+            detail = ', '.join(affix.name for affix in allowed)
+            name = 'give' if action == 'add_roles' else 'take'
+            self.bot.modlog.record(ctx.guild.id, name, moderator_id=ctx.author.id, target_id=entity.id, reason=reason, detail=detail)
+
+        successes, failures = [], {}
+        if allowed and entities:
+            async with ctx.typing():
+                job = await bulk.BulkAction(entities, apply, concurrency=5).run()
+            successes, failures = job.successes, job.failures
         
         embed = Embed(title=f'{action[:-6].capitalize()} Roles', ctx=ctx)
-        causes = ('I cannot access this entity.', 'Unexpected error.', 'This entity does not exist.', 'You cannot edit this entity.')
         attrs = ('\N{CROSS MARK}', '\N{WHITE HEAVY CHECK MARK}')
-        for affix in affixes:
-            if affix in working.keys():
-                val = str()
-                for entity in entities:
-                    if entity in working[affix]:
-                        val += f'{entity}\n'
+        if successes:
+            val = '\n'.join(str(entity) for entity in successes) if len(successes) <= 10 else f'{len(successes)} members'
+            for affix in allowed:
                 embed.add_field(name=f'{attrs[-1]} {affix}', value=val, inline=False)
-            else:
-                for signal in dump:
-                    if affix in signal:
-                        embed.add_field(name=f'{attrs[0]} {affix}', value=causes[dump.index(signal)], inline=False)
-                        break
+        
+        grouped = {}
+        for entity, error in failures.items():
+            problem = 'I cannot access this entity.' if isinstance(error, discord.Forbidden) else 'Unexpected error.'
+            grouped.setdefault(problem, []).append(str(entity))
+        for problem, failed in grouped.items():
+            embed.add_field(name=f'{attrs[0]} {problem}', value=self._truncate(failed), inline=False)
+        
+        for affix in affixes:
+            if affix not in allowed:
+                embed.add_field(name=f'{attrs[0]} {affix}', value='You cannot edit this entity.', inline=False)
         
         if len(embed.fields):
             return await ctx.send(embed=embed)
@@ -255,6 +517,145 @@ class Mod(commands.Cog):
         """
         await self._modify_roles(ctx, 'remove_roles', entities=mentions, affixes=roles, reason=reason)
 
+    @mass.command(name='give')
+    @commands.guild_only()
+    @checks.manage_roles()
+    @checks.chunked()
+    async def mass_give(self, ctx, target: discord.Role, roles: commands.Greedy[discord.Role], *, reason: Optional[Reason]):
+        """Adds roles to every member that has the target role, up to 5 roles at once.
+        
+        To use this command, you must have the Manage Roles permission.
+        The bot must have the Manage Roles permission for this command to run.
+        """
+        await self._modify_roles(ctx, 'add_roles', entities=target.members, affixes=roles, max_length=1000, reason=reason)
+
+    @mass.command(name='take')
+    @commands.guild_only()
+    @checks.manage_roles()
+    @checks.chunked()
+    async def mass_take(self, ctx, target: discord.Role, roles: commands.Greedy[discord.Role], *, reason: Optional[Reason]):
+        """Takes roles from every member that has the target role, up to 5 roles at once.
+        
+        To use this command, you must have the Manage Roles permission.
+        The bot must have the Manage Roles permission for this command to run.
+        """
+        await self._modify_roles(ctx, 'remove_roles', entities=target.members, affixes=roles, max_length=1000, reason=reason)
+
+    @commands.group(invoke_without_command=True)
+    @commands.guild_only()
+    @checks.can_ban()
+    async def raid(self, ctx):
+        """Shows the status of raid protection in the server.
+        
+        When enabled, bursts of joins from new accounts put the server in raid mode for 10 minutes.
+        New accounts that joined during the burst or that join during raid mode are then banned or kicked in batches.
+        Raid mode is announced in the system channel and recorded in the moderation log.
+
+        To use this command, you must have the Ban Members permission.
+        """
+        action = self._raids.action(ctx.guild.id)
+        if action is None:
+            return await ctx.reply('Raid protection is disabled.')
+        
+        status = 'in raid mode' if self._raids.is_raiding(ctx.guild.id, time.time()) else 'not in raid mode'
+        await ctx.reply(f'Raid protection is enabled with the {action} action. The server is {status}.')
+
+    @raid.command(name='on')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def raid_on(self, ctx, action: Optional[str] = 'ban'):
+        """Enables raid protection, with either the ban (default) or kick action.
+        
+        To use this command, you must have the Ban Members permission.
+        The bot must have the Ban Members or Kick Members permission for this command to work.
+        """
+        if action not in ('ban', 'kick'):
+            return await ctx.reply('The raid action must be either ban or kick.')
+        self._raids.set_action(ctx.guild.id, action)
+        await ctx.message.add_reaction('\N{THUMBS UP SIGN}')
+
+    @raid.command(name='off')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def raid_off(self, ctx):
+        """Disables raid protection and leaves raid mode.
+        
+        To use this command, you must have the Ban Members permission.
+        """
+        self._raids.set_action(ctx.guild.id, None)
+        self._raid_queue.pop(ctx.guild.id, None)
+        await ctx.message.add_reaction('\N{THUMBS UP SIGN}')
+
+    @raid.command(name='end')
+    @commands.guild_only()
+    @checks.can_ban()
+    async def raid_end(self, ctx):
+        """Leaves raid mode early while keeping raid protection enabled.
+        
+        To use this command, you must have the Ban Members permission.
+        """
+        self._raids.end(ctx.guild.id)
+        await ctx.message.add_reaction('\N{THUMBS UP SIGN}')
+
+    @commands.command()
+    @commands.guild_only()
+    @checks.is_mod()
+    async def modlog(self, ctx, user: Optional[TargetID]):
+        """Lists the moderation actions taken in the server, newest first.
+        
+        If a member is mentioned (or an ID given), only actions taken against or by them are listed.
+
+        To use this command, you must have the Manage Server permission.
+        """
+        entries = self.bot.modlog.query(ctx.guild.id, user)
+        if not entries:
+            return await ctx.reply('No moderation actions have been recorded.')
+        
+        menu = Pages(ModLogPageSource(entries, ctx), ctx)
+        await menu.start(ctx)
+
+    async def _cleanup_indexed(self, ctx, mentions, limit, *, check):
+        members = {member.id: member for member in mentions}
+        found, scanned, since = self._recent_messages.search(ctx.channel.id, members, before=ctx.message.id, limit=limit)
+        counts = Counter(members[author_id] for _, author_id in found)
+
+        cutoff = discord.utils.time_snowflake(datetime.datetime.utcnow() - datetime.timedelta(days=14))
+        recent = [(message_id, author_id) for message_id, author_id in found if message_id > cutoff]
+        for idx in range(0, len(recent), 100):
+            chunk = recent[idx:idx+100]
+            try:
+                await ctx.channel.delete_messages([discord.Object(id=message_id) for message_id, _ in chunk])
+            except discord.NotFound:
+                # only raised when a single message is left, which was deleted in the meantime
+                counts[members[chunk[0][1]]] -= 1
+        for message_id, author_id in found:
+            if message_id <= cutoff:
+                try:
+                    await ctx.channel.get_partial_message(message_id).delete()
+                except discord.NotFound:
+                    counts[members[author_id]] -= 1
+        
+        if scanned < limit:
+            before = discord.Object(id=since) if since is not None else ctx.message
+            deleted = await ctx.channel.purge(limit=limit-scanned, check=check, before=before)
+            counts.update(m.author for m in deleted)
+        return +counts
+
+    @commands.Cog.listener()
+    async def on_shard_connect(self, shard_id):
+        # dispatched for every new session but not for resumes, which replay missed events
+        count = self.bot.shard_count or 1
+        self._recent_messages.forget(lambda guild_id: (guild_id >> 22) % count == shard_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self._recent_messages.remove(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        for message_id in payload.message_ids:
+            self._recent_messages.remove(payload.channel_id, message_id)
+
     @commands.command(aliases=['purge'])
     @commands.guild_only()
     @commands.cooldown(rate=1, per=10.0, type=commands.BucketType.channel)
@@ -263,6 +664,7 @@ class Mod(commands.Cog):
         """Cleans up messages in the channel.
         
         If members are mentioned, this commands searches the channel history for messages sent by these members.
+        Recent messages are looked up in an index kept by the bot, and only older ones require a history search.
         Otherwise, all messages within the limit are deleted.
         
         Please note that this is a very expensive operation, so it may take a while for messages to be cleaned up.
@@ -283,9 +685,15 @@ class Mod(commands.Cog):
             await ctx.reply(f'You can only delete up to {max_delete} messages at once.')
         
         async with ctx.channel.typing():
-            deleted = await ctx.channel.purge(limit=min(max(0, limit), max_delete), check=check, before=ctx.message)
+            limit = min(max(0, limit), max_delete)
+            if mentions:
+                cache = list((await self._cleanup_indexed(ctx, mentions, limit, check=check)).items())
+            else:
+                deleted = await ctx.channel.purge(limit=limit, check=check, before=ctx.message)
+                cache = list(Counter(m.author for m in deleted).items())
 
-            cache = list(Counter(m.author for m in deleted).items())
+            for member, number in cache:
+                self.bot.modlog.record(ctx.guild.id, 'cleanup', moderator_id=ctx.author.id, target_id=member.id, detail=f'{number} messages in #{ctx.channel}')
 
             total = last = 0
             for data in cache:
@@ -298,6 +706,28 @@ class Mod(commands.Cog):
             response = f'Deleted {sum(number for _, number in cache)} messages.\n' + '\n'.join('- '+str(member)+': '+str(number) for member, number in cache)
             await ctx.reply(response)
 
+    async def _load_badges(self):
+        attrs = {
+            'online': 'https://i.postimg.cc/Ghvwxrsk/online.png',
+            'idle': 'https://i.postimg.cc/gJ1Q3BzS/idle.png',
+            'dnd': 'https://i.postimg.cc/3wPT9CgW/dnd.png',
+            'offline': 'https://i.postimg.cc/1Xx78nBb/offline.png',
+        }
+
+        # search tries again on first use if this fails, but not more than once a minute
+        if time.monotonic() < self._badges_retry:
+            return
+        badges = {}
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10.0)) as session:
+                for status, url in attrs.items():
+                    async with session.get(url, raise_for_status=True) as response:
+                        badges[status] = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._badges_retry = time.monotonic() + 60.0
+            return log.warning('Could not load status badges: %s', e)
+        self._badges.update(badges)
+
     @commands.command(aliases=['whois'])
     @commands.guild_only()
     async def search(self, ctx, member: Optional[Union[discord.Member, int]]):
@@ -314,45 +744,36 @@ class Mod(commands.Cog):
         elif isinstance(member, int):
             member = await self.bot.fetch_user(member)
 
+        in_guild = ctx.guild.get_member(member.id)
+        if self.bot.intents.members and (in_guild is None or not self.bot.cache_policy.has_presence(ctx.guild)):
+            queried = await ctx.guild.query_members(user_ids=[member.id], presences=self.bot.intents.presences, cache=False)
+            in_guild = queried[0] if queried else in_guild
+        if in_guild is not None:
+            member = in_guild
+
         desc = f"User ID: ||{str(member.id)}||"
-        if ctx.guild and member in ctx.guild.members and member.nick:
+        if in_guild and member.nick:
             desc += f"\n Nickname: {member.nick}"
         
-        attrs = {
-            'online': 'https://i.postimg.cc/Ghvwxrsk/online.png',
-            'idle': 'https://i.postimg.cc/gJ1Q3BzS/idle.png',
-            'dnd': 'https://i.postimg.cc/3wPT9CgW/dnd.png',
-            'offline': 'https://i.postimg.cc/1Xx78nBb/offline.png',
-        }
-
-        asset = member.avatar_url_as(size=128)
-        data = BytesIO(await asset.read())
-        profile = Image.open(data).convert('RGBA')
-
-        small, large, shift = (30, 125, 5)
-        profile = profile.resize((large, large))
-        if member in ctx.guild.members:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(attrs[str(member.status)]) as response:
-                    buffer = BytesIO(await response.read())
-                    status = Image.open(buffer).resize((small, small)).convert('RGBA')
+        status = str(member.status) if in_guild else None
+        key = (member.avatar or f'default-{member.default_avatar.value}', status, 128)
+        profile = self._profiles.get(key)
+        if profile is None:
+            if status and not self._badges:
+                await self._load_badges()
             
-            draw = ImageDraw.Draw(profile)
-            points = [(large-small-2*shift, large-small-2*shift), (large, large)]
-            draw.ellipse(points, fill=(35, 39, 42, 255))
-            
-            profile.paste(status, (large-small-shift, large-small-shift), mask=status)
+            badge = self._badges.get(status)
+            avatar = await member.avatar_url_as(size=128).read()
+            profile = await self.bot.images.submit(imaging.profile, avatar, status if badge else None, badge)
+            if badge or not status:
+                self._profiles[key] = profile
 
         embed = Embed(title=str(member), description=desc, author=member, ctx=ctx)
-
-        with BytesIO() as binary:
-            profile.save(binary, 'PNG')
-            binary.seek(0)
-            avatar = discord.File(fp=binary, filename='pfp.png')
+        avatar = discord.File(fp=BytesIO(profile), filename='pfp.png')
         
         embed.set_thumbnail(url='attachment://pfp.png')
         embed.add_field(name='Creation Date', value=member.created_at.strftime('%b %d, %Y'))
-        if member in ctx.guild.members:
+        if in_guild:
             embed.add_field(name='Join Date', value=member.joined_at.strftime('%b %d, %Y'))
             if len(member.roles) > 1:
                 embed.add_field(name='Top Roles', value='\n'.join(role.mention for role in member.roles[5:0:-1]))
@@ -361,46 +782,107 @@ class Mod(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message_delete(self, message):
-        self._deleted_messages[message.channel.id] = message
+        self._deleted_messages.add(message.channel.id, message)
         
     @commands.Cog.listener()
-    async def on_message_edit(self, before, _):
-        self._deleted_messages[before.channel.id] = before
+    async def on_message_edit(self, before, after):
+        if before.content != after.content:
+            self._deleted_messages.add(before.channel.id, before)
 
     @commands.command()
     @commands.guild_only()
-    async def snipe(self, ctx, channel: Optional[discord.TextChannel]):
-        """Retrieves the most recent deleted/edited message in a channel."""
+    async def snipe(self, ctx, channel: Optional[discord.TextChannel], index: Optional[int] = 1):
+        """Retrieves a recently deleted/edited message in a channel.
+        
+        The index (one-indexed) pages back through the last 10 deleted/edited messages of the past hour.
+        """
         if channel is None:
             channel = ctx.channel
 
-        try:
-            message = self._deleted_messages[channel.id]
-        except KeyError:
+        history = self._deleted_messages.history(channel.id)
+        if not history:
             return await ctx.reply("There's nothing to snipe!")
+        if index > len(history) or index < 1:
+            return await ctx.reply(f'There are only {len(history)} messages to snipe in {channel.mention}.')
 
+        message = history[index-1]
         embed = Embed(title=f'By {message.author}', ctx=ctx)
         embed.set_thumbnail(url='https://i.postimg.cc/mg0bg2wz/snipe.png')
 
         if message.content:
             embed.add_field(name='Content', value=f'{message.content}')
         if message.attachments:
-            embed.add_field(name='Top Attachments', value='\n'.join(f'[{attachment.filename}]({attachment.url})' for attachment in message.attachments[:5]), inline=False)
+            embed.add_field(name='Top Attachments', value='\n'.join(f'[{filename}]({url})' for filename, url in message.attachments), inline=False)
+        if len(history) > 1:
+            embed.set_footer(text=f'Message {index}/{len(history)}')
 
         await ctx.send(embed=embed)
     
+    async def _order_clones(self, ctx, clones, *, reason):
+        created = {clone.id for clone in clones.values()}
+        ordered = []
+        for channel in sorted((c for c in ctx.guild.text_channels if c.id not in created), key=lambda c: (c.position, c.id)):
+            ordered.append((channel, channel.category_id))
+            if channel in clones:
+                ordered.append((clones[channel], channel.category_id))
+        
+        payload = []
+        for position, (channel, parent_id) in enumerate(ordered):
+            if channel.position != position or channel.id in created:
+                payload.append({'id': channel.id, 'position': position, 'parent_id': parent_id})
+        if payload:
+            await self.bot.http.bulk_channel_update(ctx.guild.id, payload, reason=reason)
+
     @commands.command()
     @commands.guild_only()
     @checks.is_mod()
     async def clone(self, ctx, channels: commands.Greedy[discord.TextChannel], *, reason: Optional[Reason]):
-        """Clones text channels in the server, including permissions, up to 5 at once.
+        """Clones text channels in the server, including permissions, up to 50 at once.
+
+        Each clone is placed right below the channel it was cloned from.
 
         To use this command, you must have the Manage Server permission.
         The bot must have the Manage Server permission for this command to run.
         """
         if not channels:
             channels = [ctx.channel]
-        await self._modify_access(ctx, 'clone', entities=channels, bucket='channels', max_length=5, reason=reason)
+        channels = await self._modify_list(ctx, channels, 'channels', 50)
+        
+        if reason is None:
+            reason = f'{ctx.author} (ID: {ctx.author.id}): No reason provided.'
+        
+        clones = {}
+        async def apply(channel):
+            clones[channel] = await channel.clone(reason=reason)
+        
+        embed = Embed(title='Clone Channels', description=f'Cloning {len(channels)} channels...', ctx=ctx)
+        message = await ctx.send(embed=embed)
+
+        async def on_progress(job):
+            embed.description = f'Cloned {len(job.successes)}/{len(channels)} channels.'
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException:
+                pass
+        
+        job = await bulk.BulkAction(channels, apply, concurrency=5).run(on_progress=on_progress)
+        if clones:
+            embed.description = f'Cloned {len(clones)}/{len(channels)} channels. Moving them into place...'
+            await message.edit(embed=embed)
+            await self._order_clones(ctx, clones, reason=reason)
+
+        attrs = ('\N{CROSS MARK}', '\N{WHITE HEAVY CHECK MARK}')
+        embed.description = f'{len(job.successes)} succeeded, {len(job.failures)} failed.'
+        if job.successes:
+            embed.add_field(name=f'{attrs[-1]} Success', value=self._truncate([clones[channel].mention for channel in job.successes]), inline=False)
+        
+        grouped = {}
+        for channel, error in job.failures.items():
+            problem = 'I cannot access these entities.' if isinstance(error, discord.Forbidden) else 'Unexpected error.'
+            grouped.setdefault(problem, []).append(channel.mention)
+        for problem, failed in grouped.items():
+            embed.add_field(name=f'{attrs[0]} {problem}', value=self._truncate(failed), inline=False)
+        await message.edit(embed=embed)
 
 
 def setup(bot):
@@ -1,16 +1,18 @@
 import asyncio
 from typing import Optional
 from collections import defaultdict, deque
-import youtube_dl
 
 from .utils import checks
-from .utils.paginator import Embed, Pages
+from .utils.lazy import LazyModule
+from .utils.paginator import Embed, Pages, Tracked
 
 from discord.ext import commands, menus
 from discord.errors import ClientException
 import discord
 
-class MusicMenu(menus.Menu):
+youtube_dl = LazyModule('youtube_dl')
+
+class MusicMenu(Tracked, menus.Menu):
     def __init__(self, data):
         super().__init__(timeout=10.0, clear_reactions_after=True)
         self.formatted = data
@@ -0,0 +1,154 @@
+import datetime, os, time
+from io import BytesIO, StringIO
+from aiohttp import web
+
+from .utils import paginator
+from .utils.metrics import Metrics
+from .utils.paginator import Embed
+
+from discord.ext import commands, tasks
+import discord
+
+class Stats(commands.Cog):
+    """Tracks how the bot performs."""
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = Metrics()
+        self._runner = None
+        self._rates, self._previous = {}, None
+
+        bot.before_invoke(self._before_invoke)
+        bot.after_invoke(self._after_invoke)
+        self._sample.start()
+        if 'METRICS_PORT' in os.environ:
+            port = int(os.environ['METRICS_PORT']) + (bot.cluster_id or 0)
+            self.bot.loop.create_task(self._serve(port))
+
+    def cog_unload(self):
+        self.bot._before_invoke = self.bot._after_invoke = None
+        self._sample.cancel()
+        if self._runner is not None:
+            self.bot.loop.create_task(self._runner.cleanup())
+
+    async def _serve(self, port):
+        app = web.Application()
+        app.router.add_get('/metrics', self._scrape)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', port).start()
+
+    async def _scrape(self, _):
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8', headers={'Cache-Control': 'no-store'})
+
+    def render(self):
+        gauges = {'guilds': len(self.bot.guilds), 'image_jobs_pending': self.bot.images.pending, 'menus_open': len(paginator.registry)}
+        api = self.bot.get_cog('API')
+        if api is not None:
+            gauges['executions_queued'], gauges['executions_running'] = api.scheduler.queued, api.scheduler.running
+        gauges['rest_queued'], gauges['rest_running'] = self.bot.outbound.queued, self.bot.outbound.running
+        counters = {'rest_coalesced': self.bot.outbound.coalesced, 'rest_dropped': self.bot.outbound.dropped}
+        return self.metrics.render(latencies=self.bot.latencies, gauges=gauges, counters=counters)
+
+    async def _before_invoke(self, ctx):
+        ctx.invoked_at = time.perf_counter()
+
+    async def _after_invoke(self, ctx):
+        self.metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - ctx.invoked_at)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        if ctx.command is not None:
+            error = getattr(error, 'original', error)
+            self.metrics.observe_error(ctx.command.qualified_name, type(error).__name__)
+
+    def _shard(self, event, data):
+        """Returns the shard an event arrived on, following Discord's sharding formula, or None if unknown."""
+        if not isinstance(data, dict):
+            return None
+        if event == 'READY':
+            return data['shard'][0] if 'shard' in data else 0
+        guild_id = data.get('guild_id') or (data.get('id') if event in ('GUILD_CREATE', 'GUILD_UPDATE', 'GUILD_DELETE') else None)
+        if guild_id is None:
+            # events that are not about a guild, such as direct messages, are only sent to shard 0
+            return 0
+        return (int(guild_id) >> 22) % (self.bot.shard_count or 1)
+
+    @commands.Cog.listener()
+    async def on_socket_response(self, message):
+        event = message.get('t')
+        if event is None:
+            return self.metrics.observe_event(f'op {message.get("op")}')
+        self.metrics.observe_event(event, self._shard(event, message.get('d')))
+
+    @tasks.loop(minutes=1.0)
+    async def _sample(self):
+        now, events = time.monotonic(), dict(self.metrics.events)
+        if self._previous is not None:
+            then, previous = self._previous
+            self._rates = {key: (count - previous.get(key, 0)) / (now - then) for key, count in events.items()}
+        self._previous = (now, events)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """Summarizes command usage and latency, shard latency, and gateway event rates."""
+        embed = Embed(title='Stats', ctx=ctx)
+
+        busiest = sorted(self.metrics.commands.items(), key=lambda item: item[1].count, reverse=True)[:10]
+        lines = []
+        for name, metrics in busiest:
+            errors = sum(metrics.errors.values())
+            line = f'`{name}`: {metrics.count} runs, {errors} errors'
+            if metrics.latency.count:
+                p50, p95 = metrics.latency.quantile(0.5), metrics.latency.quantile(0.95)
+                line += f', p50 ≤ {p50:g} s, p95 ≤ {p95:g} s'
+            lines.append(line)
+        embed.add_field(name='Commands', value='\n'.join(lines) or 'No commands run yet.', inline=False)
+
+        shards = '\n'.join(f'Shard {shard_id}: {1000*latency:.0f} ms' for shard_id, latency in self.bot.latencies[:20])
+        embed.add_field(name='Shards', value=shards or 'Not connected.')
+
+        stages = '\n'.join(f'`{name}`: {1e6 * total / count:.1f} us' for name, count, total in self.bot.pipeline.timings if count)
+        embed.add_field(name='Message Pipeline', value=stages or 'No messages yet.')
+
+        menus = paginator.registry.counts
+        embed.add_field(name='Menus', value=f'{menus["menus"]} open across {menus["user"]} users and {menus["channel"]} channels')
+
+        outbound = self.bot.outbound
+        sent = ', '.join(f'{count} {name}' for name, count in outbound.sent.most_common())
+        embed.add_field(name='REST', value=f'{outbound.queued} queued, {outbound.running} running\n'
+                                            f'Sent: {sent or "nothing yet"}\n{outbound.coalesced} coalesced, {outbound.dropped} dropped')
+
+        rates = sorted(self._rates.items(), key=lambda item: item[1], reverse=True)[:8]
+        events = '\n'.join(f'`{name}`{"" if shard is None else f" (shard {shard})"}: {rate:.2f}/s' for (shard, name), rate in rates)
+        embed.add_field(name='Events (last minute)', value=events or 'Not sampled yet.')
+
+        if self.bot.ipc is not None and self.bot.ipc.stats:
+            clusters = self.bot.ipc.stats.values()
+            guilds = sum(cluster['guilds'] for cluster in clusters)
+            embed.add_field(name='Clusters', value=f'{len(clusters)} clusters, {guilds} guilds', inline=False)
+        await ctx.reply(embed=embed)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def stalls(self, ctx, count: int = 10):
+        """Dumps the most recent times the event loop stalled, with what it was running."""
+        stalls = list(self.bot.watchdog.stalls)[-count:][::-1]
+        if not stalls:
+            return await ctx.reply(f'The event loop has not stalled for more than {self.bot.watchdog.threshold:g} s.')
+
+        summary, dump = [], StringIO()
+        for stall in stalls:
+            when = datetime.datetime.utcfromtimestamp(stall.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            source = stall.command or stall.task or 'unknown task'
+            if stall.cog:
+                source = f'{stall.cog}: {source}'
+            summary.append(f'`{when}` {1000*stall.duration:.0f} ms in `{source}`')
+            dump.write(f'{when} UTC, {1000*stall.duration:.0f} ms, {source}\n{"".join(stall.stack)}\n')
+
+        file = discord.File(fp=BytesIO(dump.getvalue().encode('utf-8')), filename='stalls.txt')
+        await ctx.reply('\n'.join(summary[:20]), file=file)
+
+
+def setup(bot):
+    bot.add_cog(Stats(bot))
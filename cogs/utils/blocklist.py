@@ -0,0 +1,99 @@
+import heapq, itertools, json, os, time
+
+class Blocklist:
+    """Blocked user IDs per scope, where a scope is either 'global' or a guild ID.
+
+    Lookups are a dictionary access. Entries may expire, in which case a heap of expiry times
+    drives a single timer that removes them, and every change is written to disk so that
+    blocks survive restarts. Local changes are passed to on_change, if set, so that other
+    processes can apply them too.
+    """
+    def __init__(self, path, *, loop):
+        self.path = path
+        self.loop = loop
+        self._entries = {}
+        self._expiry = []
+        self._order = itertools.count()
+        self._timer = None
+        self.on_change = None
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+
+        now = time.time()
+        for scope, user_id, expires in data:
+            if expires is None or expires > now:
+                self._entries[(scope, user_id)] = expires
+                if expires is not None:
+                    self._expiry.append((expires, next(self._order), scope, user_id))
+        heapq.heapify(self._expiry)
+        self._schedule()
+
+    def _save(self):
+        data = [[scope, user_id, expires] for (scope, user_id), expires in self._entries.items()]
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp, 'w') as file:
+            json.dump(data, file)
+        os.replace(temp, self.path)
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._expiry:
+            delay = max(0.0, self._expiry[0][0] - time.time())
+            self._timer = self.loop.call_later(delay, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        now, changed = time.time(), False
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, _, scope, user_id = heapq.heappop(self._expiry)
+            if self._entries.get((scope, user_id)) == expires:
+                del self._entries[(scope, user_id)]
+                changed = True
+        if changed:
+            self._save()
+        self._schedule()
+
+    def _active(self, key):
+        expires = self._entries.get(key, False)
+        return expires is None or (expires is not False and expires > time.time())
+
+    def is_blocked(self, user_id, guild_id=None):
+        if self._active(('global', user_id)):
+            return True
+        return guild_id is not None and self._active((guild_id, user_id))
+
+    def add(self, scope, user_id, *, duration: float = None, expires: float = None, notify: bool = True):
+        if duration is not None:
+            expires = time.time() + duration
+        current = self._entries.get((scope, user_id), False)
+        if current is None or (current is not False and expires is not None and current >= expires):
+            # an entry that lasts at least as long already exists
+            return
+        self._entries[(scope, user_id)] = expires
+        if expires is not None:
+            heapq.heappush(self._expiry, (expires, next(self._order), scope, user_id))
+            self._schedule()
+        self._save()
+        if notify and self.on_change is not None:
+            self.on_change('block', scope, user_id, expires)
+
+    def remove(self, scope, user_id, *, notify: bool = True):
+        del self._entries[(scope, user_id)]
+        self._save()
+        if notify and self.on_change is not None:
+            self.on_change('unblock', scope, user_id, None)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
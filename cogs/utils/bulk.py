@@ -0,0 +1,64 @@
+import asyncio, re, time
+
+_id_regex = re.compile(r'<@!?(\d{15,20})>|\b(\d{15,20})\b')
+
+def parse_ids(text):
+    """Returns the unique user IDs in a text, from either mentions or raw IDs, in order of appearance."""
+    found = {}
+    for mention, raw in _id_regex.findall(text):
+        found[int(mention or raw)] = None
+    return list(found)
+
+
+class BulkAction:
+    """Applies one coroutine function to many targets with a bounded number of workers.
+
+    discord.py already holds a lock per rate-limit bucket and sleeps through 429s, so a handful
+    of workers is enough to keep every bucket an action touches busy without flooding the client.
+    Progress is reported at most once per interval while the action runs.
+    """
+    def __init__(self, targets, action, *, concurrency: int = 5):
+        self.targets = list(targets)
+        self.action = action
+        self.concurrency = concurrency
+        self.successes = []
+        self.failures = {}
+
+    @property
+    def done(self):
+        return len(self.successes) + len(self.failures)
+
+    async def _worker(self, queue):
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self.action(target)
+            except Exception as e:
+                self.failures[target] = e
+            else:
+                self.successes.append(target)
+
+    async def run(self, *, on_progress=None, interval: float = 2.0):
+        queue = asyncio.Queue()
+        for target in self.targets:
+            queue.put_nowait(target)
+
+        workers = [asyncio.ensure_future(self._worker(queue)) for _ in range(min(self.concurrency, len(self.targets)))]
+        try:
+            if on_progress is None:
+                await asyncio.gather(*workers)
+                return self
+
+            pending, last = set(workers), time.monotonic()
+            while pending:
+                _, pending = await asyncio.wait(pending, timeout=interval)
+                if pending and time.monotonic() - last >= interval:
+                    last = time.monotonic()
+                    await on_progress(self)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return self
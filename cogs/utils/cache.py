@@ -0,0 +1,39 @@
+import time
+from collections import OrderedDict
+
+class ExpiringCache(OrderedDict):
+    """A least recently used mapping whose entries also expire a fixed number of seconds after being set.
+
+    Expired entries are dropped lazily when looked up, or evicted with the rest once the cache is full.
+    """
+    def __init__(self, seconds: float, *, max_size: int = 128):
+        super().__init__()
+        self.ttl = seconds
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, key):
+        value, expires = super().__getitem__(key)
+        if time.monotonic() > expires:
+            super().__delitem__(key)
+            raise KeyError(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, (value, time.monotonic() + self.ttl))
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
@@ -5,10 +5,18 @@ async def _check_permissions(ctx, perms, *, check=all):
     return check(getattr(resolved, name, None) == value for name, value in perms.items())
 
 def can_use(ctx, user, target):
-    return (user == ctx.guild.owner or (target != ctx.guild.owner and user.top_role > target.top_role))
+    return (user.id == ctx.guild.owner_id or (target.id != ctx.guild.owner_id and user.top_role > target.top_role))
 
 def can_set(ctx, user, role):
-    return (user == ctx.guild.owner or user.top_role > role)
+    return (user.id == ctx.guild.owner_id or user.top_role > role)
+
+def chunked():
+    """Fetches every member of the guild before the command runs, unless they are already cached."""
+    async def hook(*args):
+        ctx = args[-1]
+        if ctx.guild is not None and not ctx.guild.chunked:
+            await ctx.guild.chunk()
+    return commands.before_invoke(hook)
 
 def can_ban():
     async def wrap(ctx):
@@ -0,0 +1,173 @@
+import os, pwd, shutil, signal, selectors, subprocess, tempfile, time
+from .lazy import LazyModule
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+pytio = LazyModule('pytio')
+
+class Execution:
+    """The outcome of running a submission, independent of where it ran."""
+    __slots__ = ('output', 'error', 'real', 'user', 'sys', 'share', 'exit')
+
+    def __init__(self, *, output, error, real, user, sys, share, exit):
+        self.output, self.error = output, error
+        self.real, self.user, self.sys, self.share, self.exit = real, user, sys, share, exit
+
+    @property
+    def timings(self):
+        return (self.real, self.user, self.sys, self.share, self.exit)
+
+
+class Backend:
+    def supports(self, language):
+        raise NotImplementedError
+
+    def execute(self, language, code, stdin=''):
+        raise NotImplementedError
+
+
+class TioBackend(Backend):
+    """Runs code remotely with the Try It Online interpreter."""
+    def supports(self, language):
+        return True
+
+    def execute(self, language, code, stdin=''):
+        request = pytio.TioRequest(lang=language, code=code)
+        if stdin:
+            request.set_input(stdin)
+        result = pytio.Tio().send(request)
+
+        read = str(result.debug.decode('utf-8'))
+        cut = read.index('Real time')
+        data = read[cut-1:].split('\n')
+        times = [''.join(data[idx][11:].split(' ')) for idx in range(1, 5)]
+        times.append(data[5][11:])
+
+        error = result.error[:cut-2] if result.error else None
+        return Execution(output=result.result, error=error, real=times[0], user=times[1], sys=times[2], share=times[3], exit=times[4])
+
+
+class LocalBackend(Backend):
+    """Runs code in local subprocesses jailed with bubblewrap and confined by resource limits.
+
+    Every process gets a fresh temporary directory as its only writable path, a read-only view of
+    the system, private /proc, network and process namespaces, a minimal environment, and caps on
+    CPU time, memory, file size and process count. The process count is only enforced per user, so
+    submissions run as a dedicated unprivileged user, and without one no language is supported.
+    """
+    _languages = {
+        'python3': ('code.py', None, ('python3', '-I', '-S', 'code.py')),
+        'c-gcc': ('code.c', ('gcc', '-O2', '-o', 'prog', 'code.c', '-lm'), ('./prog',)),
+        'cpp-gcc': ('code.cpp', ('g++', '-O2', '-o', 'prog', 'code.cpp'), ('./prog',)),
+    }
+    _system = ('/usr', '/bin', '/lib', '/lib64', '/etc/alternatives', '/etc/ld.so.cache')
+    _signals = {
+        signal.SIGXCPU: 'CPU time limit exceeded.',
+        signal.SIGKILL: 'Killed, most likely for exceeding the CPU time limit.',
+        signal.SIGXFSZ: 'File size limit exceeded.',
+        signal.SIGSEGV: 'Segmentation fault, possibly from exceeding the memory limit.',
+    }
+
+    def __init__(self, *, user: str = None, cpu: int = 5, memory: int = 256, file_size: int = 4, processes: int = 64,
+                 timeout: float = 10.0, output: int = 16384):
+        self.user = pwd.getpwnam(user) if user is not None else None
+        self.cpu, self.memory, self.file_size, self.processes = cpu, memory << 20, file_size << 20, processes
+        self.timeout, self.output = timeout, output
+
+    def supports(self, language):
+        try:
+            source, compiler, command = self._languages[language]
+        except KeyError:
+            return False
+        return (resource is not None and self.user is not None and shutil.which('bwrap') is not None
+                and shutil.which((compiler or command)[0]) is not None)
+
+    def _limit(self):
+        # the soft limit sends SIGXCPU so that the kill can be told apart from others
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu, self.cpu + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (self.memory, self.memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (self.file_size, self.file_size))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_NPROC, (self.processes, self.processes))
+
+    def _jail(self, args, cwd):
+        jail = [shutil.which('bwrap'), '--unshare-all', '--die-with-parent', '--clearenv', '--proc', '/proc', '--dev', '/dev', '--tmpfs', '/tmp']
+        for path in self._system:
+            jail += ['--ro-bind-try', path, path]
+        jail += ['--bind', cwd, '/sandbox', '--chdir', '/sandbox',
+                 '--setenv', 'PATH', '/usr/local/bin:/usr/bin:/bin', '--setenv', 'HOME', '/sandbox', '--setenv', 'LANG', 'C.UTF-8']
+        return [*jail, '--', *args]
+
+    def _spawn(self, args, cwd, stdin=''):
+        os.chown(cwd, self.user.pw_uid, self.user.pw_gid)
+        start = time.monotonic()
+        proc = subprocess.Popen(self._jail(args, cwd), cwd=cwd, env={}, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, preexec_fn=self._limit, start_new_session=True,
+                                user=self.user.pw_uid, group=self.user.pw_gid, extra_groups=())
+
+        try:
+            proc.stdin.write(stdin.encode('utf-8'))
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        streams = {proc.stdout: bytearray(), proc.stderr: bytearray()}
+        deadline, killed, timed_out = start + self.timeout, False, False
+        with selectors.DefaultSelector() as selector:
+            for stream in streams:
+                selector.register(stream, selectors.EVENT_READ)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, 4096)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        continue
+
+                    buffer = streams[key.fileobj]
+                    buffer += data[:self.output - len(buffer)]
+                    if len(buffer) >= self.output and not killed:
+                        killed = True
+                        os.killpg(proc.pid, signal.SIGKILL)
+
+        if timed_out and not killed:
+            os.killpg(proc.pid, signal.SIGKILL)
+
+        _, status, usage = os.wait4(proc.pid, 0)
+        real = time.monotonic() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        proc.stdout.close()
+        proc.stderr.close()
+
+        output, error = (bytes(streams[stream]).decode('utf-8', 'replace') for stream in (proc.stdout, proc.stderr))
+        if timed_out:
+            error += f'\nTimed out after {self.timeout:g} seconds.'
+        elif not killed and proc.returncode > 128:
+            # bubblewrap exits with 128 plus the signal that killed the submission
+            signum = proc.returncode - 128
+            error += '\n' + self._signals.get(signum, f'Killed by signal {signum}.')
+        return output, error, proc.returncode, real, usage
+
+    def execute(self, language, code, stdin=''):
+        source, compiler, command = self._languages[language]
+        with tempfile.TemporaryDirectory(prefix='run-') as cwd:
+            with open(os.path.join(cwd, source), 'w') as file:
+                file.write(code)
+
+            if compiler:
+                _, error, exit, _, _ = self._spawn(compiler, cwd)
+                if exit:
+                    return Execution(output='', error=error, real='0.000s', user='0.000s', sys='0.000s', share='0.00%', exit=str(exit))
+
+            output, error, exit, real, usage = self._spawn(command, cwd, stdin)
+
+        share = 100 * (usage.ru_utime + usage.ru_stime) / real if real else 0
+        return Execution(output=output, error=error.strip() or None, real=f'{real:.3f}s', user=f'{usage.ru_utime:.3f}s',
+                         sys=f'{usage.ru_stime:.3f}s', share=f'{share:.2f}%', exit=str(exit))
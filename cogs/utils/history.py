@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+class _ChannelIndex:
+    __slots__ = ('guild_id', 'messages', 'since')
+
+    def __init__(self, guild_id, since):
+        self.guild_id = guild_id
+        self.messages = OrderedDict()
+        self.since = since
+
+
+class MessageIndex:
+    """Remembers the IDs and authors of the most recent messages in each channel.
+
+    Every message with an ID of at least `since` that has not been deleted is in a channel's index,
+    so the newest messages of a channel can be searched without going through its history.
+    Channels themselves are evicted least recently used first. Messages missed while disconnected
+    would break that promise, so the channels of guilds that may have missed some must be forgotten.
+    """
+    def __init__(self, *, per_channel: int = 1000, max_channels: int = 100):
+        self.per_channel, self.max_channels = per_channel, max_channels
+        self._channels = OrderedDict()
+
+    def add(self, message):
+        try:
+            index = self._channels[message.channel.id]
+            self._channels.move_to_end(message.channel.id)
+        except KeyError:
+            index = self._channels[message.channel.id] = _ChannelIndex(message.guild.id, message.id)
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+
+        index.messages[message.id] = message.author.id
+        if len(index.messages) > self.per_channel:
+            oldest, _ = index.messages.popitem(last=False)
+            index.since = oldest + 1
+
+    def forget(self, predicate):
+        """Drops the index of every channel whose guild ID matches predicate."""
+        for channel_id in [channel_id for channel_id, index in self._channels.items() if predicate(index.guild_id)]:
+            del self._channels[channel_id]
+
+    def remove(self, channel_id, message_id):
+        index = self._channels.get(channel_id)
+        if index is not None:
+            index.messages.pop(message_id, None)
+
+    def search(self, channel_id, authors, *, before, limit):
+        """Scans up to limit indexed messages older than before, newest first.
+
+        Returns the matching (message ID, author ID) pairs, how many messages were scanned,
+        and the ID the index is complete from, or None if the channel is not indexed.
+        """
+        index = self._channels.get(channel_id)
+        if index is None:
+            return [], 0, None
+
+        found, scanned = [], 0
+        for message_id in reversed(index.messages):
+            if scanned >= limit:
+                break
+            if message_id >= before:
+                continue
+            scanned += 1
+            author_id = index.messages[message_id]
+            if author_id in authors:
+                found.append((message_id, author_id))
+        return found, scanned, index.since
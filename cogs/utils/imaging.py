@@ -0,0 +1,88 @@
+import asyncio, multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from .lazy import LazyModule
+
+Image, ImageDraw = LazyModule('PIL.Image'), LazyModule('PIL.ImageDraw')
+
+class ImageRejected(Exception):
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __str__(self):
+        return self.reason
+
+
+def _encode(image):
+    with BytesIO() as binary:
+        image.save(binary, 'PNG')
+        return binary.getvalue()
+
+def pad(raw, *, margin: int = 20):
+    """Pastes an image onto a white background with a margin around it."""
+    old = Image.open(BytesIO(raw))
+
+    size = (old.size[0] + margin, old.size[1] + margin)
+    new = Image.new("RGB", size, (255, 255, 255))
+    new.paste(old, (int(margin / 2), int(margin / 2)))
+    return _encode(new)
+
+_badges = {}
+
+def _badge(status, raw, small):
+    try:
+        return _badges[(status, small)]
+    except KeyError:
+        badge = _badges[(status, small)] = Image.open(BytesIO(raw)).resize((small, small)).convert('RGBA')
+        return badge
+
+def profile(avatar, status=None, badge=None, *, small: int = 30, large: int = 125, shift: int = 5):
+    """Resizes an avatar and draws a status badge in its bottom right corner.
+
+    Badges are decoded once per worker process and reused by status name.
+    """
+    image = Image.open(BytesIO(avatar)).convert('RGBA').resize((large, large))
+    if status is not None:
+        badge = _badge(status, badge, small)
+
+        draw = ImageDraw.Draw(image)
+        points = [(large-small-2*shift, large-small-2*shift), (large, large)]
+        draw.ellipse(points, fill=(35, 39, 42, 255))
+
+        image.paste(badge, (large-small-shift, large-small-shift), mask=badge)
+    return _encode(image)
+
+
+class ImageService:
+    """Runs Pillow work in a pool of worker processes so that it never blocks the event loop.
+
+    Jobs take raw bytes and return PNG bytes. Inputs above max_bytes and submissions
+    beyond max_jobs pending at once are rejected instead of queued.
+    """
+    def __init__(self, *, workers: int = None, max_jobs: int = 32, max_bytes: int = 8 << 20):
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context)
+        self.max_jobs, self.max_bytes = max_jobs, max_bytes
+        self._pending = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def submit(self, func, *buffers, **kwargs):
+        if any(buffer is not None and len(buffer) > self.max_bytes for buffer in buffers):
+            raise ImageRejected(f'Images larger than {self.max_bytes >> 20} MB cannot be processed.')
+        if self._pending >= self.max_jobs:
+            raise ImageRejected('Too many images are being processed right now. Please try again later.')
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *buffers, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
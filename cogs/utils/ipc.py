@@ -0,0 +1,63 @@
+import asyncio, json
+
+class Client:
+    """Connects a cluster to the launcher and keeps cross-cluster state in sync.
+
+    Messages are JSON objects, one per line. Global blocks and unblocks are forwarded to every
+    other cluster, and each cluster periodically reports its stats, which the launcher aggregates
+    and sends back to everyone.
+    """
+    def __init__(self, bot, *, port: int, secret: str, cluster: int, interval: float = 60.0):
+        self.bot = bot
+        self.port, self.secret, self.cluster, self.interval = port, secret, cluster, interval
+        self.stats = {}
+        self._writer = None
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [self.bot.loop.create_task(self._connect()), self.bot.loop.create_task(self._report())]
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+    def send(self, op, **data):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write((json.dumps({'op': op, **data}) + '\n').encode('utf-8'))
+
+    async def _connect(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+                self.send('identify', cluster=self.cluster, secret=self.secret)
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._dispatch(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._writer = None
+            await asyncio.sleep(5.0)
+
+    def _dispatch(self, payload):
+        op = payload.get('op')
+        if op == 'block':
+            self.bot.blocked.add(payload['scope'], payload['user_id'], expires=payload['expires'], notify=False)
+        elif op == 'unblock':
+            try:
+                self.bot.blocked.remove(payload['scope'], payload['user_id'], notify=False)
+            except KeyError:
+                pass
+        elif op == 'stats':
+            self.stats = payload['clusters']
+
+    async def _report(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self.send('stats', cluster=self.cluster, guilds=len(self.bot.guilds), users=len(self.bot.users),
+                      shards=list(self.bot.shards), latency=self.bot.latency)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,128 @@
+import re
+from collections import Counter
+
+# Most frequent character trigrams per language, most common first.
+# Spaces mark word boundaries, so ' th' is "th" at the start of a word.
+_profiles = {
+    'en': (' th', 'the', 'he ', 'ed ', ' an', 'and', 'nd ', ' to', 'ing', 'ng ', 'to ', ' of', 'of ', 'er ', ' in',
+           'is ', ' is', 'in ', 're ', 'at ', 'ion', ' a ', 'es ', 'ent', 'hat', 'tha', ' wh', 'you', ' yo', 'ou ',
+           'it ', ' it', 'for', ' fo', 'or ', 'on ', 'as ', ' be', 'tio', 'ly ', 'was', ' wa', 'his', ' ha', 'thi',
+           'ere', 'ter', 'her', 'all', 'are', 'ver', ' so', 'st ', 've '),
+    'es': (' de', 'de ', ' la', 'os ', 'la ', ' en', 'el ', ' el', 'es ', 'en ', ' qu', 'que', 'ue ', 'as ', ' co',
+           'ent', 'ado', ' lo', 'do ', 'er ', 'ra ', ' se', 'nte', 'ció', 'ión', 'on ', 'ar ', ' es', 'con', ' a ',
+           'los', ' un', 'las', ' po', 'est', 'ía ', 'a l', 'por', 'or ', 'ien', 'una', 'se ', ' pa', 'ara', 'par',
+           'al ', 'mos', 'ero', ' no', 'no ', 'sta', 'ste', 'pue', 'tra', 'ndo'),
+    'fr': (' de', 'es ', 'de ', ' le', 'le ', 'ent', ' la', 'la ', 'nt ', ' co', 're ', ' et', 'et ', 'les', ' pa',
+           'on ', 'ion', 'tio', 'des', ' pr', 'ne ', 'que', ' qu', 'ue ', 'ait', ' un', 'e d', 'men', ' en', 'en ',
+           'e l', ' à ', 'our', 'est', ' es', 'st ', 'ur ', 'ant', ' po', 'eur', 'ous', 'vou', ' vo', ' ne', 'pas',
+           'par', 'une', ' il', 'il ', 'je ', ' je', 'ais', 'mai', 'ell', 'ans', 'dan'),
+    'de': ('en ', 'er ', ' de', 'der', 'ie ', ' di', 'die', 'sch', 'ich', 'ein', 'den', 'che', ' un', 'und', 'nd ',
+           'ch ', ' ei', 'cht', 'in ', 'te ', 'ine', 'gen', ' da', 'es ', 'ung', 'ten', ' ge', 'ber', ' in', 'ht ',
+           ' ve', 'ter', 'das', 'as ', ' zu', 'zu ', 'ist', ' is', 'st ', 'mit', ' mi', 'nic', ' ni', 'sie', ' si',
+           'ach', 'auf', ' au', 'ere', 'wir', ' wi', 'ne ', 'hen', 'ern', 'ges'),
+    'it': (' di', 'di ', 'to ', ' la', 'la ', ' de', 'che', ' ch', 'he ', 'one', 're ', ' co', 'el ', ' il', 'il ',
+           'are', 'del', 'ell', 'lla', 'ato', 'ent', ' in', 'no ', 'per', ' pe', 'er ', ' e ', 'ta ', 'ne ', 'con',
+           'non', ' no', 'ere', 'gli', ' un', 'una', 'ia ', 'ri ', 'ndo', ' so', 'ono', 'anc', 'nch', 'ess', ' qu',
+           'tto', 'io ', 'ame', 'zio', 'ion', 'le '),
+    'pt': (' de', 'de ', 'os ', ' qu', 'que', 'ue ', 'do ', ' co', ' a ', 'da ', 'ão ', 'ção', 'es ', 'ent', 'as ',
+           ' e ', ' se', ' o ', ' em', 'em ', ' pa', 'com', 'nte', 'ar ', ' do', 'ra ', 'ado', 'par', 'não', ' nã',
+           ' um', 'um ', 'uma', 'est', ' es', ' da', 'ões', 'ido', 'to ', 'men', 'ara', 'ela', 'mos', 'voc', 'ocê',
+           'mas', ' ma', 'eu ', ' eu', 'se ', 'tem', 'são', 'nha'),
+    'nl': ('en ', ' de', 'de ', 'an ', 'het', ' he', 'et ', 'van', ' va', ' en', 'een', ' ee', 'er ', 'aar', 'ing',
+           'ij ', ' ge', 'ver', 'oor', ' in', 'in ', 'den', ' te', 'te ', ' da', 'dat', 'at ', 'ten', 'ie ', 'is ',
+           ' is', 'ijk', 'nie', ' ni', 'iet', 'ik ', ' ik', 'zij', ' zi', 'voo', ' vo', 'ook', 'gen', 'ent', 'ter',
+           'wel', 'maa', ' ma', 'die', ' di', 'met', ' me', 'jn ', 'eft', 'ben'),
+}
+
+# Frequent English words, for checking that a text detected as English is made of English.
+_english = frozenset('''
+a about after again all also am an and any anyone are as at be because been but by can could did do does doing don't
+for from get got had has have he her here him his how i i'm if in is it it's just know like me more my no not now of
+on one only or other our out really so some someone that that's the their them then there these they this to too up
+us very was we well were what when where which who why will with would yes yet you you're your
+'''.split())
+
+# Frequent words of the other profiled languages that are not English words too, to catch mixed texts.
+_foreign = frozenset('''
+ich du nicht ist das und der sie wir ein eine kein keine habe auch aber auf bist
+je nous vous est pas les des une avec mais pour c'est
+los las que por para pero muy está
+che non sono della gli
+você não uma mas isso
+ik jij het een niet maar ook zijn
+'''.split())
+
+_weights = {lang: {gram: len(grams) - rank for rank, gram in enumerate(grams)} for lang, grams in _profiles.items()}
+
+# Scripts that identify a language on their own, checked in order.
+# Japanese mixes kana with kanji, so any real share of kana wins over Chinese.
+_scripts = (
+    ('ja', re.compile(r'[぀-ヿ]'), 5),
+    ('ko', re.compile(r'[가-힯ᄀ-ᇿ]'), 2),
+    ('zh-cn', re.compile(r'[一-鿿]'), 2),
+    ('ru', re.compile(r'[Ѐ-ӿ]'), 2),
+    ('el', re.compile(r'[Ͱ-Ͽ]'), 2),
+    ('iw', re.compile(r'[֐-׿]'), 2),
+    ('ar', re.compile(r'[؀-ۿ]'), 2),
+    ('hi', re.compile(r'[ऀ-ॿ]'), 2),
+    ('th', re.compile(r'[฀-๿]'), 2),
+)
+
+_noise = re.compile(r'(<a?:\w+:\d+>|https?://\S+|[\d_]|[^\w\s\'])+')
+_space = re.compile(r'\s+')
+
+_min_score = 0.06
+
+_english_letters = 20
+_english_margin = 2.0
+_english_coverage = 0.18
+_english_words = 0.35
+
+def _trigrams(text):
+    padded = f' {text} '
+    return Counter(padded[i:i+3] for i in range(len(padded) - 2))
+
+def _script(text, letters):
+    for lang, regex, share in _scripts:
+        if len(regex.findall(text)) * share > letters:
+            return lang
+    return None
+
+def _clean(text):
+    return _space.sub(' ', _noise.sub(' ', text)).strip().lower()
+
+def _scores(grams):
+    total = sum(grams.values())
+    scores = []
+    for lang, weights in _weights.items():
+        hit = sum(weights.get(gram, 0) * count for gram, count in grams.items())
+        scores.append((hit / (total * len(weights)), lang))
+    return sorted(scores, reverse=True)
+
+def script(text):
+    """Returns the googletrans code of a language that the script of a text identifies on its own, or None."""
+    text = _clean(text)
+    letters = sum(1 for char in text if char.isalpha())
+    return _script(text, letters) if letters else None
+
+def is_english(text):
+    """Returns whether a text is English with enough certainty to skip translating it.
+
+    Besides a clear lead over the other profiles, enough of the text has to be made of common
+    English words and trigrams, so that languages without a profile do not pass, and it may not
+    contain more than one frequent word of another language, so that mixed texts do not pass.
+    """
+    text = _clean(text)
+    if sum(1 for char in text if char.isalpha()) < _english_letters:
+        return False
+
+    grams = _trigrams(text)
+    (best, lang), (second, _) = _scores(grams)[:2]
+    if lang != 'en' or best < _min_score or best < second * _english_margin:
+        return False
+
+    coverage = sum(count for gram, count in grams.items() if gram in _weights['en']) / sum(grams.values())
+    words = text.split()
+    if coverage < _english_coverage or sum(word in _foreign for word in words) > 1:
+        return False
+    return sum(word in _english for word in words) >= _english_words * len(words)
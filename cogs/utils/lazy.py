@@ -0,0 +1,21 @@
+import importlib, time
+
+imports = {}
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used.
+
+    How long each import took is recorded in `imports`, keyed by module name.
+    """
+    def __init__(self, name):
+        self._name, self._module = name, None
+
+    def _load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            imports[self._name] = time.perf_counter() - start
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
@@ -0,0 +1,95 @@
+import bisect, math
+from collections import Counter, defaultdict
+
+_buckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(**labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+class Histogram:
+    """Counts observations into fixed buckets, the last of which is unbounded."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=_buckets):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum, self.count = 0.0, 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket the q-th quantile falls in."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def cumulative(self):
+        seen = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            yield ('+Inf' if bound == math.inf else repr(bound)), seen
+
+
+class CommandMetrics:
+    __slots__ = ('count', 'errors', 'latency')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = Counter()
+        self.latency = Histogram()
+
+
+class Metrics:
+    """Command counts, errors and latencies, and gateway event counts per shard, rendered in the Prometheus text format."""
+    def __init__(self):
+        self.commands = defaultdict(CommandMetrics)
+        self.events = Counter()
+
+    def observe_command(self, name, seconds):
+        metrics = self.commands[name]
+        metrics.count += 1
+        metrics.latency.observe(seconds)
+
+    def observe_error(self, name, error):
+        self.commands[name].errors[error] += 1
+
+    def observe_event(self, name, shard=None):
+        self.events[(shard, name)] += 1
+
+    def render(self, *, latencies=(), gauges=None, counters=None):
+        lines = [
+            '# HELP bot_commands_total Commands invoked.',
+            '# TYPE bot_commands_total counter',
+        ]
+        lines.extend(f'bot_commands_total{_labels(command=name)} {metrics.count}' for name, metrics in self.commands.items())
+
+        lines += ['# HELP bot_command_errors_total Commands that raised an error.', '# TYPE bot_command_errors_total counter']
+        for name, metrics in self.commands.items():
+            lines.extend(f'bot_command_errors_total{_labels(command=name, error=error)} {count}' for error, count in metrics.errors.items())
+
+        lines += ['# HELP bot_command_latency_seconds Time taken by commands.', '# TYPE bot_command_latency_seconds histogram']
+        for name, metrics in self.commands.items():
+            histogram = metrics.latency
+            lines.extend(f'bot_command_latency_seconds_bucket{_labels(command=name, le=bound)} {count}' for bound, count in histogram.cumulative())
+            lines.append(f'bot_command_latency_seconds_sum{_labels(command=name)} {histogram.sum}')
+            lines.append(f'bot_command_latency_seconds_count{_labels(command=name)} {histogram.count}')
+
+        lines += ['# HELP bot_gateway_events_total Gateway events received by each shard.', '# TYPE bot_gateway_events_total counter']
+        lines.extend(f'bot_gateway_events_total{_labels(shard="none" if shard is None else shard, event=name)} {count}'
+                     for (shard, name), count in self.events.items())
+
+        lines += ['# HELP bot_shard_latency_seconds Gateway heartbeat latency of each shard.', '# TYPE bot_shard_latency_seconds gauge']
+        lines.extend(f'bot_shard_latency_seconds{_labels(shard=shard_id)} {latency}' for shard_id, latency in latencies if math.isfinite(latency))
+
+        for name, value in (gauges or {}).items():
+            lines += [f'# TYPE bot_{name} gauge', f'bot_{name} {value}']
+        for name, value in (counters or {}).items():
+            lines += [f'# TYPE bot_{name}_total counter', f'bot_{name}_total {value}']
+        return '\n'.join(lines) + '\n'
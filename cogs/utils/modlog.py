@@ -0,0 +1,120 @@
+import json, os, time
+from collections import defaultdict
+
+class Entry:
+    __slots__ = ('timestamp', 'guild_id', 'action', 'moderator_id', 'target_id', 'reason', 'detail')
+
+    def __init__(self, timestamp, guild_id, action, moderator_id, target_id, reason=None, detail=None):
+        self.timestamp, self.guild_id, self.action = timestamp, guild_id, action
+        self.moderator_id, self.target_id = moderator_id, target_id
+        self.reason, self.detail = reason, detail
+
+    def to_list(self):
+        return [self.timestamp, self.guild_id, self.action, self.moderator_id, self.target_id, self.reason, self.detail]
+
+
+class ModLog:
+    """An append-only log of moderation actions, one JSON array per line.
+
+    Each entry is appended with a single write to a file opened in append mode, so that cluster
+    processes sharing the file never interleave their lines, and writes are synced to disk together,
+    either once max_pending entries are waiting or flush_after seconds after the first unsynced one.
+    Once the file grows past max_bytes it is rotated to a single backup. Every entry is also indexed
+    in memory by guild, target and moderator, keeping the newest per_guild entries of each guild,
+    so that queries never have to read the file back.
+    """
+    def __init__(self, path, *, loop, flush_after: float = 2.0, max_pending: int = 100,
+                 max_bytes: int = 8 << 20, per_guild: int = 1000):
+        self.path, self.loop = path, loop
+        self.flush_after, self.max_pending = flush_after, max_pending
+        self.max_bytes, self.per_guild = max_bytes, per_guild
+        self._by_guild = defaultdict(list)
+        self._by_target = defaultdict(list)
+        self._by_moderator = defaultdict(list)
+        self._pending = 0
+        self._timer = None
+        for path in (f'{path}.1', path):
+            self._load(path)
+        self._fd = self._open()
+
+    def _open(self):
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _load(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        self._index(Entry(*json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def _index(self, entry):
+        entries = self._by_guild[entry.guild_id]
+        entries.append(entry)
+        if entry.target_id is not None:
+            self._by_target[(entry.guild_id, entry.target_id)].append(entry)
+        self._by_moderator[(entry.guild_id, entry.moderator_id)].append(entry)
+
+        if len(entries) > self.per_guild:
+            # the oldest entry of a guild is also the oldest of its target and moderator
+            oldest = entries.pop(0)
+            for index, key in ((self._by_target, (oldest.guild_id, oldest.target_id)), (self._by_moderator, (oldest.guild_id, oldest.moderator_id))):
+                if key in index:
+                    del index[key][0]
+                    if not index[key]:
+                        del index[key]
+
+    def _rotate(self):
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            current = None
+
+        if current is not None and current.st_ino == os.fstat(self._fd).st_ino:
+            if current.st_size < self.max_bytes:
+                return
+            try:
+                os.replace(self.path, f'{self.path}.1')
+            except FileNotFoundError:
+                pass
+        # another cluster may have rotated the file already, in which case it is only reopened
+        os.close(self._fd)
+        self._fd = self._open()
+
+    def record(self, guild_id, action, *, moderator_id, target_id=None, reason=None, detail=None):
+        entry = Entry(time.time(), guild_id, action, moderator_id, target_id, reason, detail)
+        os.write(self._fd, (json.dumps(entry.to_list()) + '\n').encode('utf-8'))
+        self._index(entry)
+
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.flush_after, self.flush)
+        return entry
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            os.fsync(self._fd)
+            self._pending = 0
+            self._rotate()
+
+    def query(self, guild_id, user_id=None):
+        """Returns the entries of a guild, optionally only those where a user was the target or moderator, newest first."""
+        if user_id is None:
+            return self._by_guild.get(guild_id, [])[::-1]
+
+        targeted = self._by_target.get((guild_id, user_id), [])
+        moderated = self._by_moderator.get((guild_id, user_id), [])
+        merged = {id(entry): entry for entry in targeted + moderated}
+        return sorted(merged.values(), key=lambda entry: entry.timestamp, reverse=True)
+
+    def close(self):
+        self.flush()
+        os.close(self._fd)
@@ -0,0 +1,173 @@
+import asyncio, heapq, itertools
+from collections import Counter
+from functools import partial
+
+MODERATION, REPLY, DEFAULT, COSMETIC = range(4)
+names = ('moderation', 'reply', 'default', 'cosmetic')
+
+_moderation = ('/guilds/{guild_id}/bans/', '/guilds/{guild_id}/members/{user_id}')
+_replies = {
+    ('POST', '/channels/{channel_id}/messages'),
+    ('PATCH', '/channels/{channel_id}/messages/{message_id}'),
+    ('POST', '/channels/{channel_id}/typing'),
+    ('POST', '/users/@me/channels'),
+}
+
+def classify(route):
+    """Returns the priority class of a discord.py route, lower running first."""
+    method, path = route.method, route.path
+    if '/reactions' in path:
+        return DEFAULT if method == 'GET' else COSMETIC
+    if method != 'GET' and path.startswith(_moderation):
+        return MODERATION
+    if (method, path) in _replies:
+        return REPLY
+    return DEFAULT
+
+
+class _Call:
+    __slots__ = ('priority', 'order', 'bucket', 'key', 'call', 'future', 'waiters')
+
+    def __init__(self, priority, order, bucket, key, call, future):
+        self.priority, self.order = priority, order
+        self.bucket, self.key = bucket, key
+        self.call, self.future = call, future
+        self.waiters = 0
+
+    def __lt__(self, other):
+        return (self.priority, self.order) < (other.priority, other.order)
+
+
+class Outbound:
+    """Puts every REST call the bot makes through one priority queue.
+
+    Calls are classified by route into moderation, replies, everything else and cosmetic
+    reactions, and started in that order. Like discord.py itself, only one call per rate limit
+    bucket is in flight at a time, and a bucket stays busy until discord.py releases its lock when
+    the rate limit from the response headers resets, so a queued call never sleeps on a bucket
+    while holding a slot. Replies may use all of the `concurrency` slots, everything else all but
+    `reserved` of them, and moderation is never held back by other calls. An identical reaction
+    call that is already waiting is shared instead of queued again, and once `pressure` calls are
+    waiting, reactions are dropped, both new ones and those already queued.
+    """
+    def __init__(self, http, *, concurrency: int = 10, reserved: int = 4, pressure: int = 50):
+        self.loop = http.loop
+        self.concurrency, self.reserved, self.pressure = concurrency, reserved, pressure
+        self._request = http.request
+        self._locks = http._locks
+        http.request = self.request
+        self._queue = []
+        self._order = itertools.count()
+        self._busy = set()
+        self._pending = {}
+        self._running = 0
+        self.sent, self.coalesced, self.dropped = Counter(), 0, 0
+
+    @property
+    def queued(self):
+        return len(self._queue)
+
+    @property
+    def running(self):
+        return self._running
+
+    async def request(self, route, **kwargs):
+        priority, key = classify(route), None
+        if priority == COSMETIC:
+            key = (route.method, route.url)
+            call = self._pending.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return await self._wait(call)
+            if len(self._queue) >= self.pressure:
+                self.dropped += 1
+                return None
+        elif len(self._queue) >= self.pressure:
+            self._shed()
+
+        future = self.loop.create_future()
+        call = _Call(priority, next(self._order), route.bucket, key, partial(self._request, route, **kwargs), future)
+        if key is not None:
+            self._pending[key] = call
+        heapq.heappush(self._queue, call)
+        self._dispatch()
+        return await self._wait(call)
+
+    async def _wait(self, call):
+        # the call is only cancelled once every requester sharing it has given up
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.future.done():
+                call.future.cancel()
+
+    def _limit(self, priority):
+        if priority == MODERATION:
+            return float('inf')
+        return self.concurrency if priority == REPLY else self.concurrency - self.reserved
+
+    def _shed(self):
+        kept = []
+        for call in self._queue:
+            if call.priority == COSMETIC:
+                self._pending.pop(call.key, None)
+                if not call.future.done():
+                    call.future.set_result(None)
+                    self.dropped += 1
+            else:
+                kept.append(call)
+        heapq.heapify(kept)
+        self._queue = kept
+
+    def _dispatch(self):
+        deferred = []
+        while self._queue:
+            call = heapq.heappop(self._queue)
+            if call.future.done():
+                self._pending.pop(call.key, None)
+            elif call.bucket in self._busy:
+                deferred.append(call)
+            elif self._running < self._limit(call.priority):
+                self._start(call)
+            else:
+                # calls come out in priority order, so nothing after this one may start either
+                deferred.append(call)
+                break
+        for call in deferred:
+            heapq.heappush(self._queue, call)
+
+    def _start(self, call):
+        self._busy.add(call.bucket)
+        self._running += 1
+        self.sent[names[call.priority]] += 1
+        task = self.loop.create_task(call.call())
+        task.add_done_callback(partial(self._finish, call))
+        call.future.add_done_callback(lambda future: future.cancelled() and task.cancel())
+
+    def _finish(self, call, task):
+        self._running -= 1
+        self._pending.pop(call.key, None)
+        if not call.future.done():
+            if task.cancelled():
+                call.future.cancel()
+            elif task.exception() is not None:
+                call.future.set_exception(task.exception())
+            else:
+                call.future.set_result(task.result())
+        elif not task.cancelled():
+            task.exception()
+
+        # discord.py keeps the lock of an exhausted bucket until its rate limit resets
+        lock = self._locks.get(call.bucket)
+        if lock is not None and lock.locked():
+            self.loop.create_task(self._reset(call.bucket, lock))
+        else:
+            self._busy.discard(call.bucket)
+        self._dispatch()
+
+    async def _reset(self, bucket, lock):
+        async with lock:
+            self._busy.discard(bucket)
+        self._dispatch()
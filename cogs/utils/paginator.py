@@ -1,5 +1,6 @@
 import asyncio
 from typing import Optional
+from collections import OrderedDict
 
 from discord.ext import menus
 import discord
@@ -21,10 +22,80 @@ class Embed(discord.Embed):
         super().add_field(name=name, value=value, inline=inline)
 
 
-class Pages(menus.MenuPages):
+class MenuRegistry:
+    """Keeps track of open menus and stops the oldest ones once too many are open at once.
+
+    Limits apply per user, per channel and per guild, so that idle menus waiting for reactions
+    cannot pile up without bound.
+    """
+    def __init__(self, *, per_user: int = 2, per_channel: int = 5, per_guild: int = 50):
+        self.limits = {'user': per_user, 'channel': per_channel, 'guild': per_guild}
+        self._open = {}
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, menu, ctx):
+        keys = [('user', ctx.author.id), ('channel', ctx.channel.id)]
+        if ctx.guild is not None:
+            keys.append(('guild', ctx.guild.id))
+
+        for key in keys:
+            group = self._open.setdefault(key, OrderedDict())
+            while len(group) >= self.limits[key[0]]:
+                oldest = next(iter(group))
+                oldest.stop()
+                self.remove(oldest)
+            group[menu] = None
+        self._keys[menu] = keys
+
+    def remove(self, menu):
+        for key in self._keys.pop(menu, ()):
+            group = self._open[key]
+            group.pop(menu, None)
+            if not group:
+                del self._open[key]
+
+    @property
+    def counts(self):
+        """The number of open menus, and of users, channels and guilds that have one open."""
+        counts = {'menus': len(self._keys), 'user': 0, 'channel': 0, 'guild': 0}
+        for scope, _ in self._open:
+            counts[scope] += 1
+        return counts
+
+registry = MenuRegistry()
+
+
+class Tracked:
+    """Registers a menu for as long as it runs.
+
+    Menus without buttons, such as a single page, never wait for reactions and are not registered.
+    """
+    async def start(self, ctx, *, channel=None, wait=False):
+        if self.should_add_reactions():
+            registry.add(self, ctx)
+        try:
+            return await super().start(ctx, channel=channel, wait=wait)
+        except Exception:
+            registry.remove(self)
+            raise
+
+    async def finalize(self, timed_out):
+        registry.remove(self)
+
+
+class Pages(Tracked, menus.MenuPages):
     def __init__(self, source, context):
         super().__init__(source=source, check_embeds=True, clear_reactions_after=True)
         self.context = context
+        self._back = None
+
+    async def finalize(self, timed_out):
+        if self._back is not None:
+            self._back.cancel()
+        await super().finalize(timed_out)
     
     @menus.button('\N{INFORMATION SOURCE}\ufe0f', position=menus.Last(3))
     async def info(self, _):
@@ -43,4 +114,6 @@ class Pages(menus.MenuPages):
             await asyncio.sleep(10.0)
             await self.show_page(self.current_page)
 
-        self.bot.loop.create_task(back())
+        if self._back is not None:
+            self._back.cancel()
+        self._back = self.bot.loop.create_task(back())
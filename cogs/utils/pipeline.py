@@ -0,0 +1,43 @@
+import bisect, time
+
+class Stage:
+    __slots__ = ('name', 'func', 'order', 'count', 'total')
+
+    def __init__(self, name, func, order):
+        self.name, self.func, self.order = name, func, order
+        self.count, self.total = 0, 0.0
+
+
+class Pipeline:
+    """Runs every incoming message through ordered stages, once, before any context is built.
+
+    A stage is a plain function that takes the message and returns whether it should go on to
+    the next stage. Stages that need to await something schedule it themselves, so that the
+    common case costs a few function calls. How often each stage ran and how long it took in
+    total is recorded.
+    """
+    def __init__(self):
+        self._stages = []
+
+    def add(self, name, func, *, order: int):
+        index = bisect.bisect_right([stage.order for stage in self._stages], order)
+        self._stages.insert(index, Stage(name, func, order))
+
+    def remove(self, name):
+        self._stages = [stage for stage in self._stages if stage.name != name]
+
+    def run(self, message):
+        clock = time.perf_counter
+        for stage in self._stages:
+            start = clock()
+            passed = stage.func(message)
+            stage.total += clock() - start
+            stage.count += 1
+            if not passed:
+                return False
+        return True
+
+    @property
+    def timings(self):
+        """The name, number of runs and total seconds spent of each stage, in order."""
+        return [(stage.name, stage.count, stage.total) for stage in self._stages]
@@ -0,0 +1,46 @@
+import os
+import discord
+
+def _flags(cls, value, default):
+    """Parses comma separated flag names, or 'all' or 'none'."""
+    value = value.strip().lower() if value is not None else default
+    if value == 'all':
+        return cls.all()
+    if value == 'none':
+        return cls.none()
+
+    flags = cls.none()
+    for name in value.split(','):
+        if name.strip():
+            setattr(flags, name.strip(), True)
+    return flags
+
+class CachePolicy:
+    """Which gateway intents the bot enables and how much of each guild it keeps in memory.
+
+    Each setting is read from the environment. INTENTS names the privileged intents enabled on top
+    of the default ones, or 'all', MEMBER_CACHE names the member cache flags, or 'all' or 'none',
+    and CHUNK_GUILDS chooses whether every guild is chunked at startup. By default only the author,
+    members in voice and members who joined since startup are cached, and commands that need the
+    rest of a guild chunk it or query members on demand.
+    """
+    def __init__(self, *, intents, member_cache_flags, chunk_guilds_at_startup):
+        self.intents = intents
+        self.member_cache_flags = member_cache_flags
+        self.chunk_guilds_at_startup = chunk_guilds_at_startup
+
+    @classmethod
+    def from_env(cls):
+        intents = discord.Intents.default()
+        intents.value |= _flags(discord.Intents, os.environ.get('INTENTS'), 'members,presences').value
+        flags = _flags(discord.MemberCacheFlags, os.environ.get('MEMBER_CACHE'), 'voice,joined')
+        chunk = os.environ.get('CHUNK_GUILDS', '0').lower() in ('1', 'true', 'yes')
+        return cls(intents=intents, member_cache_flags=flags, chunk_guilds_at_startup=chunk)
+
+    @property
+    def options(self):
+        return {'intents': self.intents, 'member_cache_flags': self.member_cache_flags, 'chunk_guilds_at_startup': self.chunk_guilds_at_startup}
+
+    def has_presence(self, guild):
+        """Whether the cache already knows the status of every member of the guild, or never can."""
+        return not self.intents.presences or (self.member_cache_flags.online and guild.chunked)
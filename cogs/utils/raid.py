@@ -0,0 +1,100 @@
+import datetime, json, os
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def account_age(member, now):
+    return now - member.created_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class RaidDetector:
+    """Watches member joins per guild for bursts of new accounts.
+
+    Each guild keeps a sliding window of recent joins with the age of the joining accounts.
+    When enough accounts join within the window and most of them are young, the guild enters
+    raid mode for a while, during which every young account that joins is treated as a raider.
+    Which guilds opted in, and with which action, is saved to path if given so that it survives restarts.
+    """
+    def __init__(self, path=None, *, window: float = 30.0, threshold: int = 8, young: float = 7 * 86400.0, young_share: float = 0.6, duration: float = 600.0):
+        self.window, self.threshold, self.duration = window, threshold, duration
+        self.young, self.young_share = young, young_share
+        self.path = path
+        self.actions = self._load()
+        self._joins = {}
+        self._raids = {}
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as file:
+                return {int(guild_id): action for guild_id, action in json.load(file).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, guild_id, action):
+        # clusters share the file but each only changes its own guilds, so only this guild is written back
+        with open(f'{self.path}.lock', 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            actions = self._load()
+            if action is None:
+                actions.pop(guild_id, None)
+            else:
+                actions[guild_id] = action
+
+            temp = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp, 'w') as file:
+                json.dump(actions, file)
+            os.replace(temp, self.path)
+
+    def action(self, guild_id):
+        return self.actions.get(guild_id)
+
+    def set_action(self, guild_id, action):
+        """Enables raid protection in a guild with an action, or disables it with None."""
+        if action is None:
+            self.actions.pop(guild_id, None)
+            self.end(guild_id)
+        else:
+            self.actions[guild_id] = action
+        if self.path is not None:
+            self._save(guild_id, action)
+
+    def is_raiding(self, guild_id, now):
+        return self._raids.get(guild_id, 0) > now
+
+    def start(self, guild_id, now):
+        self._raids[guild_id] = now + self.duration
+
+    def end(self, guild_id):
+        self._raids.pop(guild_id, None)
+
+    def record(self, member, now):
+        """Records a join and returns the IDs of suspicious accounts to act on."""
+        guild_id, age = member.guild.id, account_age(member, now)
+        joins = self._joins.setdefault(guild_id, deque())
+        joins.append((now, age, member.id))
+        while joins and now - joins[0][0] > self.window:
+            joins.popleft()
+
+        if self.is_raiding(guild_id, now):
+            return [member.id] if age < self.young else []
+
+        suspicious = [user_id for _, age, user_id in joins if age < self.young]
+        if len(joins) >= self.threshold and len(suspicious) >= self.young_share * len(joins):
+            self.start(guild_id, now)
+            return suspicious
+        return []
+
+    def sweep(self, now):
+        for guild_id in [guild_id for guild_id, until in self._raids.items() if until <= now]:
+            del self._raids[guild_id]
+        for guild_id, joins in list(self._joins.items()):
+            while joins and now - joins[0][0] > self.window:
+                joins.popleft()
+            if not joins:
+                del self._joins[guild_id]
@@ -0,0 +1,140 @@
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+class QueueFull(Exception):
+    def __init__(self, limit):
+        self.limit = limit
+
+    def __str__(self):
+        return f'There are already {self.limit} submissions waiting to run. Please try again later.'
+
+
+class _Job:
+    __slots__ = ('user', 'guild', 'func', 'args', 'future', 'started')
+
+    def __init__(self, user, guild, func, args, future):
+        self.user, self.guild = user, guild
+        self.func, self.args = func, args
+        self.future = future
+        self.started = False
+
+
+class Scheduler:
+    """Runs blocking jobs on a dedicated thread pool.
+
+    Each user and guild may only have a few jobs running at once, and waiting jobs
+    are handed out round-robin by user so that a single member cannot hold up everyone else.
+    """
+    def __init__(self, loop, *, workers: int = 4, per_user: int = 1, per_guild: int = 2, max_queued: int = 50):
+        self.loop = loop
+        self.workers, self.per_user, self.per_guild, self.max_queued = workers, per_user, per_guild, max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler')
+        self._waiting = OrderedDict()
+        self._queued = self._running = 0
+        self._users, self._guilds = Counter(), Counter()
+
+    @property
+    def queued(self):
+        return self._queued
+
+    @property
+    def running(self):
+        return self._running
+
+    def position(self, job):
+        """Returns the one-indexed place of a waiting job in the round-robin order, or 0 if it has started."""
+        jobs = self._waiting.get(job.user)
+        if job.started or not jobs:
+            return 0
+
+        index, ahead, before = jobs.index(job), 0, True
+        for user, queue in self._waiting.items():
+            if user == job.user:
+                before = False
+                ahead += index
+            else:
+                ahead += min(len(queue), index + before)
+        return ahead + 1
+
+    def _runnable(self, job):
+        return self._users[job.user] < self.per_user and self._guilds[job.guild] < self.per_guild
+
+    def _next(self):
+        for user, jobs in self._waiting.items():
+            job = jobs[0]
+            if self._runnable(job):
+                jobs.popleft()
+                if jobs:
+                    self._waiting.move_to_end(user)
+                else:
+                    del self._waiting[user]
+                self._queued -= 1
+                return job
+        return None
+
+    def _dispatch(self):
+        while self._running < self.workers:
+            job = self._next()
+            if job is None:
+                return
+
+            job.started = True
+            self._running += 1
+            self._users[job.user] += 1
+            self._guilds[job.guild] += 1
+
+            future = self.loop.run_in_executor(self._executor, job.func, *job.args)
+            future.add_done_callback(partial(self._finish, job))
+
+    def _release(self, counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _finish(self, job, future):
+        self._running -= 1
+        self._release(self._users, job.user)
+        self._release(self._guilds, job.guild)
+
+        if job.future.done():
+            pass
+        elif future.cancelled():
+            job.future.cancel()
+        elif future.exception():
+            job.future.set_exception(future.exception())
+        else:
+            job.future.set_result(future.result())
+        self._dispatch()
+
+    def _discard(self, job):
+        jobs = self._waiting.get(job.user)
+        if jobs and job in jobs:
+            jobs.remove(job)
+            self._queued -= 1
+            if not jobs:
+                del self._waiting[job.user]
+
+    async def submit(self, user, guild, func, *args, on_queue=None):
+        """Runs func(*args) once a worker is free and the user and guild are under their limits.
+
+        If the job cannot start right away, on_queue is awaited with its queue position.
+        """
+        if self._queued >= self.max_queued:
+            raise QueueFull(self.max_queued)
+
+        job = _Job(user, guild, func, args, self.loop.create_future())
+        self._waiting.setdefault(user, deque()).append(job)
+        self._queued += 1
+        self._dispatch()
+
+        try:
+            if on_queue is not None and not job.started:
+                await on_queue(self.position(job))
+            return await job.future
+        except BaseException:
+            self._discard(job)
+            raise
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict, deque
+
+class Snapshot:
+    """The parts of a deleted or edited message needed to show it again."""
+    __slots__ = ('author_id', 'author', 'content', 'attachments', 'timestamp')
+
+    def __init__(self, message):
+        self.author_id = message.author.id
+        self.author = message.author.display_name
+        self.content = message.content
+        self.attachments = tuple((attachment.filename, attachment.url) for attachment in message.attachments[:5])
+        self.timestamp = time.time()
+
+
+class SnipeStore:
+    """Keeps the most recent snapshots of each channel, newest first.
+
+    Channels are evicted least recently used first once the total number of snapshots
+    passes max_entries, and snapshots older than ttl seconds are dropped when read.
+    """
+    def __init__(self, *, per_channel: int = 10, max_entries: int = 5000, ttl: float = 3600.0):
+        self.per_channel, self.max_entries, self.ttl = per_channel, max_entries, ttl
+        self._channels = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, channel_id, message):
+        try:
+            history = self._channels[channel_id]
+            self._channels.move_to_end(channel_id)
+        except KeyError:
+            history = self._channels[channel_id] = deque(maxlen=self.per_channel)
+
+        if len(history) == history.maxlen:
+            self._size -= 1
+        history.appendleft(Snapshot(message))
+        self._size += 1
+
+        while self._size > self.max_entries:
+            _, evicted = self._channels.popitem(last=False)
+            self._size -= len(evicted)
+
+    def history(self, channel_id):
+        """Returns the unexpired snapshots of a channel, newest first."""
+        try:
+            history = self._channels[channel_id]
+        except KeyError:
+            return []
+
+        expiry = time.time() - self.ttl
+        while history and history[-1].timestamp < expiry:
+            history.pop()
+            self._size -= 1
+        if not history:
+            del self._channels[channel_id]
+        return list(history)
+
+    def sweep(self):
+        for channel_id in list(self._channels):
+            self.history(channel_id)
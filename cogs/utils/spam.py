@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+import discord
+
+class SlidingWindow:
+    """Estimates how many events happened in the last `per` seconds from two fixed windows.
+
+    The previous window's count is weighted by how much of it still overlaps the sliding window,
+    so memory stays constant no matter how many events are recorded.
+    """
+    __slots__ = ('rate', 'per', 'window', 'current', 'previous')
+
+    def __init__(self, rate: int, per: float):
+        self.rate, self.per = rate, per
+        self.window = self.current = self.previous = 0
+
+    def _roll(self, now):
+        window = int(now // self.per)
+        if window != self.window:
+            self.previous = self.current if window == self.window + 1 else 0
+            self.current, self.window = 0, window
+
+    def hit(self, now):
+        """Records an event and returns whether the window is now over its rate."""
+        self._roll(now)
+        self.current += 1
+        overlap = 1 - (now / self.per - self.window)
+        return self.previous * overlap + self.current > self.rate
+
+    def expired(self, now):
+        return int(now // self.per) > self.window + 1
+
+
+class SpamCheck:
+    """Tracks repeated content and overall traffic per channel for one guild.
+
+    Content is only kept as a short hash, and each kind of bucket is capped,
+    evicting the least recently used one when full.
+    """
+    def __init__(self, *, max_buckets: int = 256):
+        self.max_buckets = max_buckets
+        self.last_seen = 0.0
+        self._short = OrderedDict()
+        self._long = OrderedDict()
+
+    def _get_bucket(self, buckets, key, rate, per):
+        try:
+            buckets.move_to_end(key)
+            return buckets[key]
+        except KeyError:
+            bucket = buckets[key] = SlidingWindow(rate, per)
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+            return bucket
+
+    def is_spamming(self, message):
+        current = ((message.id >> 22) + discord.utils.DISCORD_EPOCH) / 1000
+        self.last_seen = current
+
+        digest = blake2b(message.content.encode('utf-8'), digest_size=8).digest()
+        short_bucket = self._get_bucket(self._short, (message.channel.id, digest), 15, 15.0)
+        long_bucket = self._get_bucket(self._long, message.channel.id, 30, 32.0)
+
+        return (short_bucket.hit(current) or long_bucket.hit(current))
+
+    def sweep(self, now):
+        for buckets in (self._short, self._long):
+            for key in [key for key, bucket in buckets.items() if bucket.expired(now)]:
+                del buckets[key]
+
+
+class SpamDetector:
+    """Holds a SpamCheck per guild and forgets guilds that have gone quiet."""
+    def __init__(self, *, idle: float = 3600.0):
+        self.idle = idle
+        self._checks = {}
+
+    def __len__(self):
+        return len(self._checks)
+
+    def is_spamming(self, message):
+        if message.guild is None:
+            return False
+
+        try:
+            checker = self._checks[message.guild.id]
+        except KeyError:
+            checker = self._checks[message.guild.id] = SpamCheck()
+        return checker.is_spamming(message)
+
+    def sweep(self):
+        now = time.time()
+        for key, checker in list(self._checks.items()):
+            if now - checker.last_seen > self.idle:
+                del self._checks[key]
+            else:
+                checker.sweep(now)
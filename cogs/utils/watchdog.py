@@ -0,0 +1,72 @@
+import asyncio, sys, threading, time, traceback
+from collections import deque
+
+class Stall:
+    """A period during which the event loop did not run callbacks on time."""
+    __slots__ = ('timestamp', 'duration', 'command', 'cog', 'task', 'stack')
+
+    def __init__(self, *, timestamp, duration, command, cog, task, stack):
+        self.timestamp, self.duration = timestamp, duration
+        self.command, self.cog, self.task, self.stack = command, cog, task, stack
+
+
+class Watchdog:
+    """Measures event loop lag from a separate thread and records what the loop was doing when it stalled.
+
+    The loop bumps a timestamp every interval seconds. When the thread sees it go stale by more than
+    threshold seconds, it captures the stack of the loop thread and the task it is running, and
+    attributes the stall to the command that task is invoking, if any, through `invocations`.
+    """
+    def __init__(self, loop, *, threshold: float = 0.25, interval: float = 0.1, history: int = 50, depth: int = 15):
+        self.loop = loop
+        self.threshold, self.interval, self.depth = threshold, interval, depth
+        self.stalls = deque(maxlen=history)
+        self.invocations = {}
+        self._beat = time.monotonic()
+        self._handle = None
+        self._loop_thread = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+
+    def start(self):
+        self._handle = self.loop.call_soon(self._tick)
+        self._thread.start()
+
+    def close(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def _tick(self):
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._handle = self.loop.call_later(self.interval, self._tick)
+
+    def _capture(self, lag):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.format_stack(frame, limit=self.depth) if frame is not None else []
+        task = asyncio.current_task(self.loop)
+        ctx = self.invocations.get(task)
+        return Stall(
+            timestamp=time.time() - lag,
+            duration=lag,
+            command=ctx.command.qualified_name if ctx is not None and ctx.command else None,
+            cog=ctx.cog.qualified_name if ctx is not None and ctx.cog else None,
+            task=task.get_name() if task is not None else None,
+            stack=stack,
+        )
+
+    def _watch(self):
+        current = None
+        while not self._stopped.wait(self.interval):
+            if self._loop_thread is None:
+                continue
+
+            lag = time.monotonic() - self._beat - self.interval
+            if lag >= self.threshold:
+                if current is None:
+                    current = self._capture(lag)
+                    self.stalls.append(current)
+                current.duration = lag
+            else:
+                current = None
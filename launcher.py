@@ -0,0 +1,130 @@
+import asyncio, json, os, secrets, signal, sys, time, urllib.request
+
+class Cluster:
+    """A worker process running main.py for a contiguous range of shards."""
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.id, self.shard_ids, self.shard_count = cluster_id, shard_ids, shard_count
+        self.process = None
+        self.writer = None
+        self.stats = None
+
+    def environment(self, port, secret, workers):
+        return {
+            'IMAGE_WORKERS': str(workers),
+            **os.environ,
+            'CLUSTER_ID': str(self.id),
+            'SHARD_IDS': ','.join(map(str, self.shard_ids)),
+            'SHARD_COUNT': str(self.shard_count),
+            'IPC_PORT': str(port),
+            'IPC_SECRET': secret,
+        }
+
+
+class Launcher:
+    """Spawns one process per cluster, restarts each one independently when it exits,
+    and relays blocklist changes and stats between them over a local socket.
+    """
+    def __init__(self, shard_count, clusters):
+        per_cluster, extra = divmod(shard_count, clusters)
+        self.clusters, start = [], 0
+        for cluster_id in range(clusters):
+            end = start + per_cluster + (cluster_id < extra)
+            self.clusters.append(Cluster(cluster_id, list(range(start, end)), shard_count))
+            start = end
+
+        # clusters share the machine, so each gets its slice of the cores for image work
+        self.workers = max(1, (os.cpu_count() or 1) // clusters)
+        self.secret = secrets.token_hex(16)
+        self.port = None
+        self._closing = False
+
+    def _send(self, cluster, op, **data):
+        if cluster.writer is not None and not cluster.writer.is_closing():
+            cluster.writer.write((json.dumps({'op': op, **data}) + '\n').encode('utf-8'))
+
+    async def _serve(self, reader, writer):
+        try:
+            identify = json.loads(await reader.readline())
+            if identify.get('op') != 'identify' or not secrets.compare_digest(identify.get('secret', ''), self.secret):
+                return writer.close()
+            cluster = self.clusters[identify['cluster']]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return writer.close()
+
+        cluster.writer = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    continue
+
+                if payload.get('op') in ('block', 'unblock'):
+                    for other in self.clusters:
+                        if other is not cluster:
+                            self._send(other, **payload)
+                elif payload.get('op') == 'stats':
+                    payload.pop('op')
+                    cluster.stats = payload
+                    stats = {str(other.id): other.stats for other in self.clusters if other.stats is not None}
+                    for other in self.clusters:
+                        self._send(other, 'stats', clusters=stats)
+        except ConnectionError:
+            pass
+        finally:
+            if cluster.writer is writer:
+                cluster.writer, cluster.stats = None, None
+            writer.close()
+
+    async def _supervise(self, cluster):
+        delay = 5.0
+        while not self._closing:
+            started = time.monotonic()
+            cluster.process = await asyncio.create_subprocess_exec(
+                sys.executable, 'main.py', env=cluster.environment(self.port, self.secret, self.workers))
+            print(f'Cluster {cluster.id} started with shards {cluster.shard_ids[0]}-{cluster.shard_ids[-1]}.')
+            code = await cluster.process.wait()
+            if self._closing:
+                break
+
+            delay = 5.0 if time.monotonic() - started > 60.0 else min(delay * 2, 60.0)
+            print(f'Cluster {cluster.id} exited with code {code}, restarting in {delay:.0f} seconds.')
+            await asyncio.sleep(delay)
+
+    def close(self):
+        self._closing = True
+        for cluster in self.clusters:
+            if cluster.process is not None and cluster.process.returncode is None:
+                cluster.process.terminate()
+
+    async def run(self):
+        server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.close)
+
+        async with server:
+            await asyncio.gather(*(self._supervise(cluster) for cluster in self.clusters))
+
+
+def recommended_shards(token):
+    request = urllib.request.Request('https://discord.com/api/v9/gateway/bot', headers={
+        'Authorization': f'Bot {token}',
+        'User-Agent': 'DiscordBot (https://github.com/Rapptz/discord.py, 1.7.3)',
+    })
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)['shards']
+
+
+def main():
+    shard_count = int(os.environ.get('SHARD_COUNT') or recommended_shards(os.environ['TOKEN']))
+    clusters = min(int(os.environ.get('CLUSTERS') or os.cpu_count()), shard_count)
+    asyncio.run(Launcher(shard_count, clusters).run())
+
+if __name__ == '__main__':
+    main()
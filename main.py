@@ -1,39 +1,90 @@
-import os
-from collections import defaultdict
-from youtube_dl.utils import DownloadError
+import asyncio, os, sys, time
+from cogs.utils.blocklist import Blocklist
+from cogs.utils.imaging import ImageService
+from cogs.utils.ipc import Client
+from cogs.utils.modlog import ModLog
+from cogs.utils.outbound import Outbound
+from cogs.utils.pipeline import Pipeline
+from cogs.utils.policy import CachePolicy
+from cogs.utils.watchdog import Watchdog
 
 from discord.ext import commands
 import discord
 
+prefix = '?'
+
 initial_extensions = {
     'cogs.api',
     'cogs.meta',
     'cogs.mod',
     'cogs.music',
     'cogs.rng',
+    'cogs.stats',
     'cogs.tags',
 }
 
 class NutsandBolts(commands.AutoShardedBot):
-    def __init__(self):
-        intents = discord.Intents.all()
+    def __init__(self, *, shard_ids=None, shard_count=None, cluster_id=None):
+        self.started, self.ready_after = time.perf_counter(), None
+        self.cache_policy = CachePolicy.from_env()
+        self.help_cache = {}
         activity = discord.Activity(type=discord.ActivityType.watching, name="for ?help")
-        super().__init__(command_prefix=commands.when_mentioned_or('?'), activity=activity, intents=intents)
+        super().__init__(command_prefix=commands.when_mentioned_or(prefix), activity=activity,
+                         shard_ids=shard_ids, shard_count=shard_count, **self.cache_policy.options)
 
+        self.cluster_id, self.ipc = cluster_id, None
+        self.outbound = Outbound(self.http, pressure=int(os.environ.get('REST_PRESSURE', 50)))
+        self.pipeline = Pipeline()
+        self.pipeline.add('bots', lambda message: not message.author.bot, order=10)
+        self.pipeline.add('blocklist', self._not_blocked, order=20)
+        self.pipeline.add('prefix', self._has_prefix, order=40)
+        self.images = ImageService(workers=int(os.environ.get('IMAGE_WORKERS', 0)) or None)
+        self.watchdog = Watchdog(self.loop, threshold=float(os.environ.get('STALL_THRESHOLD', 0.25)))
+        self.watchdog.start()
+        self.load_times = {}
         for extension in initial_extensions:
+            start, modules = time.perf_counter(), len(sys.modules)
             self.load_extension(extension)
+            self.load_times[extension] = (time.perf_counter() - start, len(sys.modules) - modules)
         
-        self.owner_id, self.__token = os.environ['OWNER_ID'], os.environ['TOKEN']
-        self.blocked = defaultdict(set)
+        self.owner_id, self.__token = int(os.environ['OWNER_ID']), os.environ['TOKEN']
+        self.blocked = Blocklist(os.environ.get('BLOCKLIST_PATH', 'blocklist.json'), loop=self.loop)
+        self.modlog = ModLog(os.environ.get('MODLOG_PATH', 'modlog.jsonl'), loop=self.loop)
+
+        if 'IPC_PORT' in os.environ:
+            self.ipc = Client(self, port=int(os.environ['IPC_PORT']), secret=os.environ['IPC_SECRET'], cluster=cluster_id)
+            self.blocked.on_change = lambda op, scope, user_id, expires: self.ipc.send(op, scope=scope, user_id=user_id, expires=expires)
+            self.ipc.start()
     
+    def _not_blocked(self, message):
+        return not self.blocked.is_blocked(message.author.id, message.guild.id if message.guild else None)
+
+    def _has_prefix(self, message):
+        content = message.content
+        if content.startswith(prefix):
+            return True
+        return content.startswith('<@') and content.startswith((f'<@{self.user.id}>', f'<@!{self.user.id}>'))
+
     async def on_message(self, message):
-        blocked = self.blocked['global'].copy()
-        if message.guild:
-            blocked.update(self.blocked[message.guild.id])
-        
-        if not (message.author.bot or message.author in blocked):
+        if self.pipeline.run(message):
             await self.process_commands(message)
     
+    def add_command(self, command):
+        self.help_cache.clear()
+        super().add_command(command)
+
+    def remove_command(self, name):
+        self.help_cache.clear()
+        return super().remove_command(name)
+
+    async def invoke(self, ctx):
+        task = asyncio.current_task()
+        self.watchdog.invocations[task] = ctx
+        try:
+            await super().invoke(ctx)
+        finally:
+            del self.watchdog.invocations[task]
+
     async def on_command_error(self, ctx, error):
         if isinstance(error, commands.CommandNotFound):
             return
@@ -47,7 +98,7 @@ class NutsandBolts(commands.AutoShardedBot):
                 if isinstance(original, discord.NotFound):
                     return await ctx.reply('The requested entity was not found.')
                 return await ctx.reply('An unexpected error occurred. Please try again later.')
-            elif isinstance(original, DownloadError):
+            elif type(original).__name__ == 'DownloadError':
                 return await ctx.reply('There was an error downloading the requested video.')
             else:
                 return await ctx.reply(error.original)
@@ -55,12 +106,26 @@ class NutsandBolts(commands.AutoShardedBot):
             return await ctx.reply('You do not have permission to execute this command.')
         await ctx.reply(f'{error.__class__.__name__}: {error}')
     
+    async def close(self):
+        self.blocked.close()
+        self.modlog.close()
+        self.images.close()
+        self.watchdog.close()
+        if self.ipc is not None:
+            self.ipc.close()
+        await super().close()
+
     def run(self):
         super().run(self.__token, reconnect=True)
 
 
 def main():
-    bot = NutsandBolts()
+    shard_ids = os.environ.get('SHARD_IDS')
+    bot = NutsandBolts(
+        shard_ids=[int(shard_id) for shard_id in shard_ids.split(',')] if shard_ids else None,
+        shard_count=int(os.environ['SHARD_COUNT']) if 'SHARD_COUNT' in os.environ else None,
+        cluster_id=int(os.environ.get('CLUSTER_ID', 0)),
+    )
     bot.run()
 
 if __name__ == '__main__':